@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['email', 'purpose', 'is_verified'], name='otp_email_purpose_idx'),
+        ),
+    ]
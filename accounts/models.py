@@ -35,3 +35,9 @@ class OTPVerification(models.Model):
 
     def is_valid(self):
         return not self.is_verified and timezone.now() <= self.expires_at
+
+    class Meta:
+        indexes = [
+            # OTP verification views look codes up by email and purpose
+            models.Index(fields=['email', 'purpose', 'is_verified'], name='otp_email_purpose_idx'),
+        ]
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django import forms
-from .models import Category, Destination, DestinationImage
+from .models import Category, Destination, DestinationImage, GeocodeCacheEntry, GeocodeJob
 
 class DestinationImageInline(admin.TabularInline):
     model = DestinationImage
@@ -58,8 +58,8 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Destination)
 class DestinationAdmin(admin.ModelAdmin):
     form = DestinationAdminForm
-    list_display = ('name', 'category', 'address', 'created_at')
-    list_filter = ('category', 'created_at')
+    list_display = ('name', 'category', 'address', 'geocode_status', 'created_at')
+    list_filter = ('category', 'geocode_status', 'created_at')
     search_fields = ('name', 'description', 'address')
     prepopulated_fields = {'slug': ('name',)}
     inlines = [DestinationImageInline]
@@ -67,15 +67,28 @@ class DestinationAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         if 'images' in request.FILES:
-            for image in request.FILES.getlist('images'):
-                DestinationImage.objects.create(
-                    destination=obj,
-                    image=image,
-                    is_primary=not DestinationImage.objects.filter(destination=obj).exists()  # First image is primary
-                )
+            DestinationImage.bulk_add(
+                obj,
+                request.FILES.getlist('images'),
+                # First image is primary
+                primary_index=None if DestinationImage.objects.filter(destination=obj).exists() else 0,
+            )
 
 @admin.register(DestinationImage)
 class DestinationImageAdmin(admin.ModelAdmin):
-    list_display = ('destination', 'caption', 'is_primary', 'created_at')
-    list_filter = ('is_primary', 'created_at')
+    list_display = ('destination', 'caption', 'is_primary', 'derivatives_status', 'created_at')
+    list_filter = ('is_primary', 'derivatives_status', 'created_at')
     search_fields = ('destination__name', 'caption')
+
+@admin.register(GeocodeJob)
+class GeocodeJobAdmin(admin.ModelAdmin):
+    list_display = ('destination', 'address', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('destination__name', 'address')
+    readonly_fields = ('locked_at', 'last_error', 'created_at', 'updated_at')
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('address_key', 'latitude', 'longitude', 'found', 'source', 'expires_at')
+    list_filter = ('found', 'source')
+    search_fields = ('address_key',)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class DestinationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'destination'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import install_search_index
+
+        post_migrate.connect(install_search_index, sender=self)
+        from . import signals  # noqa: F401
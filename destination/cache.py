@@ -0,0 +1,158 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,  # Seconds an entry is served as fresh; 0 disables the cache
+    'STALE_GRACE': 60,  # Seconds a stale entry may still be served while one worker rebuilds it
+    'LOCK_TIMEOUT': 10,
+}
+
+LIST_GENERATION = 'destinations:gen:list'
+# Part of every detail key: category fields are embedded in each destination
+CATEGORY_GENERATION = 'destinations:gen:category'
+
+
+def cache_setting(name):
+    return getattr(settings, 'DESTINATION_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[cache_setting('ALIAS')]
+
+
+def _generations(keys):
+    cache = get_cache()
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # add() is a no-op when another process already initialised the counter
+            cache.add(key, 0, None)
+            found[key] = cache.get(key, 0)
+    return [found[key] for key in keys]
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def detail_generation_key(slug):
+    return f'destinations:gen:detail:{slug}'
+
+
+def invalidate(slugs=(), lists=True, categories=False):
+    """
+    Invalidate cached detail responses for ``slugs`` and, by default, every
+    cached list. ``categories`` invalidates every detail response at once,
+    for changes that reach all destinations of a category without listing
+    them. Entries are never deleted, just orphaned: bumping a generation
+    counter changes the keys that requests look up.
+    """
+    if lists:
+        _bump(LIST_GENERATION)
+    if categories:
+        _bump(CATEGORY_GENERATION)
+    for slug in set(slugs):
+        _bump(detail_generation_key(slug))
+
+
+def normalize_params(params):
+    """Query parameters in canonical order, with case-insensitive filters folded"""
+    normalized = []
+    for name in sorted(params):
+        values = params.getlist(name)
+        if name in ('city', 'search'):
+            values = [' '.join(value.casefold().split()) for value in values]
+        normalized.append((name, values))
+    return normalized
+
+
+class CachedResponseMixin:
+    """
+    Server-side cache for ``list`` and ``retrieve`` responses.
+
+    Entries are keyed on the normalized query parameters plus a generation
+    counter, which model signals bump (see destination/signals.py). Once an
+    entry goes stale, the first worker to take the rebuild lock regenerates it.
+    Other workers keep serving the stale copy, or briefly wait for the rebuild
+    when there is no copy at all.
+    """
+
+    def cache_key(self, request, generation_keys, *parts):
+        raw = repr((
+            request.scheme, request.get_host(), request.accepted_media_type,
+            normalize_params(request.query_params), *parts,
+        ))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        generations = ':'.join(str(generation) for generation in _generations(generation_keys))
+        return f'destinations:response:{generations}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        key = self.cache_key(request, [LIST_GENERATION], self.action)
+        return self.cached_response(request, key, super().list, args, kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        slug = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = self.cache_key(request, [detail_generation_key(slug), CATEGORY_GENERATION], self.action, slug)
+        return self.cached_response(request, key, super().retrieve, args, kwargs)
+
+    def cached_response(self, request, key, build, args, kwargs):
+        timeout = cache_setting('TIMEOUT')
+        if not timeout:
+            return build(request, *args, **kwargs)
+
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry and entry['expires'] > time.time():
+            return self.from_entry(request, entry)
+
+        lock = f'{key}:lock'
+        locked = cache.add(lock, 1, cache_setting('LOCK_TIMEOUT'))
+        if not locked:
+            # Someone else is rebuilding: serve what we have, or wait for theirs
+            if entry:
+                return self.from_entry(request, entry)
+            deadline = time.time() + cache_setting('LOCK_TIMEOUT')
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry:
+                    return self.from_entry(request, entry)
+
+        try:
+            response = build(request, *args, **kwargs)
+            # Streamed responses have no data to keep, and may be any size
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, {
+                    'data': response.data,
+                    'headers': {name: response[name] for name in ('ETag', 'Last-Modified') if response.has_header(name)},
+                    'expires': time.time() + timeout,
+                }, timeout + cache_setting('STALE_GRACE'))
+            return response
+        finally:
+            if locked:
+                cache.delete(lock)
+
+    def from_entry(self, request, entry):
+        headers = entry['headers']
+        if 'ETag' in headers:
+            last_modified = headers.get('Last-Modified')
+            if last_modified:
+                last_modified = datetime.fromtimestamp(parse_http_date(last_modified), tz=timezone.utc)
+            response = self.not_modified(request, headers['ETag'], last_modified)
+            if response is not None:
+                return response
+        response = Response(entry['data'], headers=headers)
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,67 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for ``list`` and ``retrieve``.
+
+    Validators come from an aggregate over ``validator_fields``: the row count
+    plus the newest timestamp of each field. A request whose ``If-None-Match``
+    (or, for detail, ``If-Modified-Since``) still matches gets a 304 before
+    any serializer work is done.
+
+    Lists send only an ETag. A deleted row changes the count but not the newest
+    timestamp, so Last-Modified would be unreliable there.
+    """
+    validator_fields = ('updated_at',)
+
+    def make_etag(self, request, *parts):
+        # The same rows render differently per query string and media type
+        key = '|'.join(str(part) for part in (request.get_full_path(), request.accepted_media_type, *parts))
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def not_modified(self, request, etag, last_modified=None):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            response['ETag'] = etag
+        return response
+
+    def add_validators(self, response, etag, last_modified=None):
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # Let clients keep the payload but always revalidate it
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregates = {f'max_{i}': Max(field) for i, field in enumerate(self.validator_fields)}
+        validators = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+        etag = self.make_etag(request, *validators.values())
+
+        response = self.not_modified(request, etag)
+        if response is not None:
+            return response
+        return self.add_validators(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        timestamps = self.get_queryset().filter(**lookup).prefetch_related(None).values_list(*self.validator_fields).first()
+        if timestamps is None:
+            # Let the normal lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+
+        last_modified = max(timestamp for timestamp in timestamps if timestamp)
+        etag = self.make_etag(request, *timestamps)
+
+        response = self.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return self.add_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,40 @@
+from django.core.files.storage import default_storage
+
+from nomadic_travel.exports import ExportView
+from nomadic_travel.media import media_url_builder
+from .models import Destination, DestinationImage
+
+
+class DestinationExportView(ExportView):
+    queryset = Destination.objects.all()
+    columns = [
+        ('id', 'id'), ('name', 'name'), ('slug', 'slug'), ('description', 'description'),
+        ('category', 'category__slug'), ('city', 'city'), ('address', 'address'),
+        ('latitude', 'latitude'), ('longitude', 'longitude'), ('geocode_status', 'geocode_status'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    filters = {'category': 'category__slug', 'city': 'city__iexact', 'geocode_status': 'geocode_status'}
+    filename = 'destinations'
+
+
+class DestinationImageExportView(ExportView):
+    queryset = DestinationImage.objects.all()
+    columns = [
+        ('id', 'id'), ('destination_id', 'destination_id'), ('destination', 'destination__slug'),
+        ('image', 'image'), ('caption', 'caption'), ('is_primary', 'is_primary'), ('created_at', 'created_at'),
+    ]
+    filters = {'destination': 'destination__slug'}
+    # Images have no updated_at, but every image change touches its destination
+    updated_field = 'destination__updated_at'
+    filename = 'destination_images'
+
+    def get_row_converter(self, request):
+        convert = super().get_row_converter(request)
+        url = media_url_builder(default_storage, request)
+        position = [name for name, _ in self.columns].index('image')
+
+        def convert_row(row):
+            row = convert(row)
+            row[position] = url(row[position]) if row[position] else None
+            return row
+        return convert_row
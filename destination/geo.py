@@ -0,0 +1,68 @@
+import heapq
+from math import asin, cos, degrees, pi, radians, sin, sqrt
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def bounding_box_filter(lat, lon, radius_km):
+    """
+    Q object for the latitude/longitude box enclosing a circle of ``radius_km``
+    around (lat, lon). The box is a superset of the circle, so results still
+    need an exact distance check.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    lat_delta = degrees(angular)
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+
+    # The circle covers a pole: every longitude is in range
+    if min_lat <= -90 or max_lat >= 90:
+        return Q(latitude__gte=max(min_lat, -90), latitude__lte=min(max_lat, 90))
+
+    lon_delta = degrees(asin(min(sin(angular) / cos(radians(lat)), 1)))
+    min_lon, max_lon = lon - lon_delta, lon + lon_delta
+    box = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    # Split the longitude range where it wraps across the antimeridian
+    if min_lon < -180:
+        return box & (Q(longitude__gte=min_lon + 360) | Q(longitude__lte=max_lon))
+    if max_lon > 180:
+        return box & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon - 360))
+    return box & Q(longitude__gte=min_lon, longitude__lte=max_lon)
+
+
+def nearest(queryset, lat, lon, radius_km, limit):
+    """
+    Return up to ``limit`` ``(distance_km, id)`` pairs from ``queryset`` within
+    ``radius_km`` of (lat, lon), closest first.
+
+    Candidates come from the indexed bounding box; only their ids and
+    coordinates are loaded (prefetches on ``queryset`` are dropped). They are
+    ranked by haversine distance in one plain-Python loop, not vectorized:
+    the index keeps the candidate set small enough not to need NumPy.
+    """
+    candidates = (
+        queryset.filter(bounding_box_filter(lat, lon, radius_km))
+        .prefetch_related(None)
+        .order_by()
+        .values_list('id', 'latitude', 'longitude')
+    )
+
+    lat1 = radians(lat)
+    lon1 = radians(lon)
+    cos_lat1 = cos(lat1)
+    # Compare on the haversine term to avoid asin/sqrt for rejected rows
+    limit_h = sin(min(radius_km / EARTH_RADIUS_KM, pi) / 2) ** 2
+
+    ranked = []
+    for pk, cand_lat, cand_lon in candidates:
+        lat2 = radians(cand_lat)
+        h = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(cand_lon) - lon1) / 2) ** 2
+        if h <= limit_h:
+            ranked.append((h, pk))
+
+    return [
+        (2 * EARTH_RADIUS_KM * asin(sqrt(h)), pk)
+        for h, pk in heapq.nsmallest(limit, ranked)
+    ]
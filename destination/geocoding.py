@@ -0,0 +1,283 @@
+import csv
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from geopy.exc import GeocoderServiceError
+from geopy.geocoders import Nominatim
+
+from .models import Destination, GeocodeCacheEntry, GeocodeJob, GeocodeThrottle
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "try again later" rather than "address not found"
+GEOCODER_ERRORS = (GeocoderServiceError,)
+
+DEFAULTS = {
+    'USER_AGENT': 'nomadic_travel',
+    'MIN_INTERVAL': 1.0,  # Nominatim usage policy: at most one request per second
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'LEASE_SECONDS': 300,
+    'BACKENDS': ['destination.geocoding.NominatimGeocoder'],
+    'GAZETTEER_PATH': None,
+    'CACHE_SIZE': 1024,
+    'NEGATIVE_TTL': 7 * 24 * 60 * 60,
+}
+
+
+def geocoding_setting(name):
+    return getattr(settings, 'GEOCODING', {}).get(name, DEFAULTS[name])
+
+
+def normalize_address(address):
+    """Cache key for an address: case-folded words separated by single spaces"""
+    return ' '.join(re.findall(r'\w+', (address or '').casefold()))[:255]
+
+
+def acquire_slot(key='nominatim'):
+    """
+    Block until this process owns the next request slot for ``key``.
+
+    The slot is a single database row shared by every worker, claimed with a
+    conditional UPDATE so that only one process can win each interval.
+    """
+    interval = timedelta(seconds=geocoding_setting('MIN_INTERVAL'))
+    GeocodeThrottle.objects.get_or_create(key=key)
+    while True:
+        now = timezone.now()
+        claimed = GeocodeThrottle.objects.filter(
+            key=key, next_allowed_at__lte=now
+        ).update(next_allowed_at=now + interval)
+        if claimed:
+            return
+        next_allowed_at = GeocodeThrottle.objects.filter(key=key).values_list('next_allowed_at', flat=True).first()
+        wait = (next_allowed_at - now).total_seconds() if next_allowed_at else 0
+        time.sleep(min(max(wait, 0.05), interval.total_seconds()))
+
+
+class BaseGeocoder:
+    """A geocoding source; ``geocode`` returns ``(latitude, longitude)`` or ``None``"""
+    name = None
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+
+class NominatimGeocoder(BaseGeocoder):
+    name = 'nominatim'
+
+    def __init__(self):
+        self.client = Nominatim(user_agent=geocoding_setting('USER_AGENT'))
+
+    def geocode(self, address):
+        acquire_slot(self.name)
+        location = self.client.geocode(address)
+        if location:
+            return location.latitude, location.longitude
+        return None
+
+
+class GazetteerGeocoder(BaseGeocoder):
+    """
+    Offline lookups from a CSV file with ``address,latitude,longitude`` columns,
+    configured through ``GEOCODING['GAZETTEER_PATH']``.
+    """
+    name = 'gazetteer'
+
+    def __init__(self, path=None):
+        self.entries = {}
+        path = path or geocoding_setting('GAZETTEER_PATH')
+        if not path:
+            return
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.entries[normalize_address(row['address'])] = (
+                    float(row['latitude']), float(row['longitude'])
+                )
+
+    def geocode(self, address):
+        return self.entries.get(normalize_address(address))
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                return None
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class GeocodeCache:
+    """
+    Address -> coordinates lookups through an in-process LRU, then the
+    ``GeocodeCacheEntry`` table, then the configured geocoder backends.
+    """
+
+    def __init__(self):
+        self.memory = LRUCache(geocoding_setting('CACHE_SIZE'))
+        self._backends = None
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    @property
+    def backends(self):
+        if self._backends is None:
+            self._backends = [import_string(path)() for path in geocoding_setting('BACKENDS')]
+        return self._backends
+
+    def lookup(self, address):
+        """
+        Return ``(latitude, longitude)``, or ``(None, None)`` when no backend knows the
+        address. Backend errors propagate and are not cached.
+        """
+        key = normalize_address(address)
+        now = timezone.now()
+
+        cached = self.memory.get(key)
+        if cached is not None and (cached[2] is None or cached[2] > now):
+            self._count('memory_hits', cached)
+            return cached[0], cached[1]
+
+        entry = GeocodeCacheEntry.objects.filter(address_key=key).first()
+        if entry and (entry.expires_at is None or entry.expires_at > now):
+            cached = (
+                float(entry.latitude) if entry.found else None,
+                float(entry.longitude) if entry.found else None,
+                entry.expires_at,
+            )
+            self.memory.set(key, cached)
+            self._count('db_hits', cached)
+            return cached[0], cached[1]
+
+        self.stats['misses'] += 1
+        coordinates, source = None, ''
+        for backend in self.backends:
+            coordinates = backend.geocode(address)
+            if coordinates:
+                source = backend.name
+                break
+
+        if coordinates:
+            lat, lon = round(coordinates[0], 6), round(coordinates[1], 6)
+            expires_at = None
+        else:
+            lat = lon = None
+            expires_at = now + timedelta(seconds=geocoding_setting('NEGATIVE_TTL'))
+
+        GeocodeCacheEntry.objects.update_or_create(
+            address_key=key,
+            defaults={
+                'latitude': lat,
+                'longitude': lon,
+                'found': lat is not None,
+                'source': source,
+                'expires_at': expires_at,
+            }
+        )
+        self.memory.set(key, (lat, lon, expires_at))
+        return lat, lon
+
+    def _count(self, kind, cached):
+        self.stats[kind] += 1
+        if cached[0] is None:
+            self.stats['negative_hits'] += 1
+
+    def clear_memory(self):
+        self.memory.clear()
+        self._backends = None
+
+
+geocode_cache = GeocodeCache()
+
+
+def geocode_address(address):
+    """Look up ``address`` through the geocode cache and return ``(latitude, longitude)``"""
+    return geocode_cache.lookup(address)
+
+
+def claim_jobs(limit):
+    """Lease up to ``limit`` runnable jobs, including ones abandoned by a dead worker"""
+    now = timezone.now()
+    runnable = (
+        Q(status='pending', run_after__lte=now) |
+        Q(status='running', locked_at__lt=now - timedelta(seconds=geocoding_setting('LEASE_SECONDS')))
+    )
+    candidates = list(GeocodeJob.objects.filter(runnable).values_list('id', flat=True)[:limit])
+
+    claimed = []
+    for job_id in candidates:
+        # Another worker may have taken the job since we read it
+        if GeocodeJob.objects.filter(runnable, pk=job_id).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1
+        ):
+            claimed.append(job_id)
+    return list(GeocodeJob.objects.filter(id__in=claimed))
+
+
+def _finish(job, **fields):
+    """Record the outcome unless the job was re-queued while we were working on it"""
+    return GeocodeJob.objects.filter(pk=job.pk, status='running', locked_at=job.locked_at).update(**fields)
+
+
+def _update_destination(job, **fields):
+    # Skip the write if the address was edited after this job was queued
+    if Destination.objects.filter(pk=job.destination_id, address=job.address).update(**fields):
+        Destination.touch([job.destination_id])
+
+
+def process_job(job):
+    """Geocode one leased job and write the coordinates back to its destination"""
+    try:
+        lat, lon = geocode_address(job.address)
+    except GEOCODER_ERRORS as e:
+        logger.warning(f"Geocoding error for job {job.pk}: {e}")
+        if job.attempts >= geocoding_setting('MAX_ATTEMPTS'):
+            if _finish(job, status='failed', last_error=str(e), locked_at=None):
+                _update_destination(job, geocode_status='failed')
+            return 'failed'
+        backoff = geocoding_setting('RETRY_BACKOFF') * 2 ** (job.attempts - 1)
+        _finish(
+            job, status='pending', last_error=str(e), locked_at=None,
+            run_after=timezone.now() + timedelta(seconds=backoff)
+        )
+        return 'retry'
+
+    if lat is None or lon is None:
+        if _finish(job, status='failed', last_error='Address not found', locked_at=None):
+            _update_destination(job, geocode_status='failed')
+        return 'failed'
+
+    if _finish(job, status='done', last_error='', locked_at=None):
+        _update_destination(job, latitude=lat, longitude=lon, geocode_status='done')
+    return 'done'
@@ -0,0 +1,131 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from nomadic_travel.media import media_url_builder
+
+from .models import Destination, DestinationImage
+
+DEFAULTS = {
+    'SIZES': [320, 640, 1280],
+    'FORMATS': ['avif', 'webp', 'jpeg'],
+    'QUALITY': 80,
+    'WORKERS': None,  # Defaults to the number of CPUs
+    'DIRECTORY': 'destinations/derivatives',
+}
+
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+
+# Missing files, undecodable or oversized images; they fail on their own
+IMAGE_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+logger = logging.getLogger(__name__)
+
+
+def derivative_setting(name):
+    return getattr(settings, 'IMAGE_DERIVATIVES', {}).get(name, DEFAULTS[name])
+
+
+def supported_formats():
+    """Configured formats this Pillow build can encode (AVIF needs a plugin)"""
+    Image.init()
+    return [fmt for fmt in derivative_setting('FORMATS') if fmt.upper() in Image.SAVE]
+
+
+def render_variants(source_path, output_dir, stem, sizes, formats, quality):
+    """
+    Write resized copies of one image and return ``{format: {width: filename}}``,
+    or ``None`` if the image can't be read or converted. Runs in a worker
+    process, so it only deals in plain paths and values.
+    """
+    variants = {}
+    try:
+        with Image.open(source_path) as original:
+            original = ImageOps.exif_transpose(original)
+            # Never upscale; small originals get a single variant at their own width
+            widths = sorted({min(width, original.width) for width in sizes})
+            for width in widths:
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), Image.LANCZOS) if width != original.width else original
+                for fmt in formats:
+                    image = resized
+                    if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                        image = image.convert('RGB')
+                    elif image.mode not in ('RGB', 'RGBA', 'L'):
+                        image = image.convert('RGBA')
+                    filename = f"{stem}_{width}.{EXTENSIONS[fmt]}"
+                    image.save(os.path.join(output_dir, filename), fmt.upper(), quality=quality)
+                    variants.setdefault(fmt, {})[str(width)] = filename
+    except IMAGE_ERRORS as e:
+        logger.warning(f"Could not generate derivatives for {source_path}: {e}")
+        return None
+    return variants
+
+
+def _render_job(image):
+    directory = derivative_setting('DIRECTORY')
+    output_dir = default_storage.path(directory)
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(image.image.name))[0]
+    return (
+        # An image row without a file fails in render_variants like a missing one
+        image.image.path if image.image else '', output_dir, f"{stem}_{image.pk}",
+        derivative_setting('SIZES'), supported_formats(), derivative_setting('QUALITY'),
+    )
+
+
+def pending_images():
+    """Images queued for derivatives, oldest first"""
+    return DestinationImage.objects.filter(derivatives_status='pending').order_by('id')
+
+
+def generate_derivatives(images, workers=None):
+    """
+    Render the configured sizes and formats for ``images`` and store them in
+    ``DestinationImage.variants``. Several images are spread across a process
+    pool unless ``workers`` is 1. Images that can't be rendered are marked
+    failed and don't stop the others. Returns the number rendered.
+
+    This is slow (Pillow spends ~0.1s per image); call it from the
+    generate_image_derivatives worker, not from a request.
+    """
+    images = list(images)
+    if not images:
+        return 0
+
+    directory = derivative_setting('DIRECTORY')
+    jobs = [_render_job(image) for image in images]
+    workers = workers or derivative_setting('WORKERS') or os.cpu_count()
+    if len(jobs) == 1 or workers == 1:
+        results = [render_variants(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(render_variants, *zip(*jobs)))
+
+    for image, variants in zip(images, results):
+        image.derivatives_status = 'failed' if variants is None else 'done'
+        image.variants = {
+            fmt: {width: f"{directory}/{filename}" for width, filename in files.items()}
+            for fmt, files in (variants or {}).items()
+        }
+    DestinationImage.objects.bulk_update(images, ['variants', 'derivatives_status'])
+    rendered = [image for image in images if image.derivatives_status == 'done']
+    # New srcsets change the destinations' payloads
+    Destination.touch({image.destination_id for image in rendered})
+    return len(rendered)
+
+
+def build_srcset(variants, request=None):
+    """``{format: "url 320w, url 640w"}`` for use in <picture>/<source srcset>"""
+    srcset = {}
+    url = media_url_builder(default_storage, request)
+    for fmt, files in variants.items():
+        entries = []
+        for width, name in sorted(files.items(), key=lambda item: int(item[0])):
+            entries.append(f"{url(name)} {width}w")
+        srcset[fmt] = ', '.join(entries)
+    return srcset
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import OTPVerification
+from destination.geo import bounding_box_filter
+from destination.models import Destination, normalize_name
+from destination.views import CategoryViewSet, DestinationViewSet
+from schedule.views import TourViewSet
+
+
+def viewset_queryset(viewset_class, params=None, user=None, action='list'):
+    """The queryset a viewset would build for a GET with ``params``"""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    if user is not None:
+        request.user = user
+    view = viewset_class(request=request, action=action, format_kwarg=None, kwargs={})
+    return view.get_queryset()
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the queries behind each viewset and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='Exit with an error if any query scans a table')
+
+    def representative_queries(self):
+        user = get_user_model()(pk=1)
+        now = timezone.now()
+        destinations = lambda params=None: viewset_queryset(DestinationViewSet, params)
+
+        # (label, queryset, whether a full scan is acceptable)
+        return [
+            ('destinations: list', destinations()[:10], True),
+            ('destinations: ?category=', destinations({'category': 'camping'})[:10], False),
+            ('destinations: ?city=', destinations({'city': 'Lahore'})[:10], False),
+            ('destinations: ?search=', destinations({'search': 'fort'})[:10], False),
+            ('destinations: keyset page', destinations().filter(created_at__lt=now)[:10], False),
+            ('destinations: ?ordering=popular', destinations({'ordering': 'popular'})[:10], True),
+            ('destinations: retrieve', destinations().filter(slug='lahore-fort'), False),
+            ('destinations: nearby', destinations().filter(bounding_box_filter(31.5, 74.3, 10)).order_by().values_list('id'), False),
+            ('categories: list', viewset_queryset(CategoryViewSet)[:10], True),
+            ('tours: list', viewset_queryset(TourViewSet, user=user)[:10], False),
+            ('tours: keyset page', viewset_queryset(TourViewSet, user=user).filter(start_date__lt=now)[:10], False),
+            ('tours: destination by name', Destination.objects.filter(name_key=normalize_name('Lahore Fort')), False),
+            ('accounts: OTP lookup', OTPVerification.objects.filter(
+                email='a@example.com', otp='123456', purpose='REGISTRATION', is_verified=False), False),
+        ]
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def is_full_scan(self, line):
+        if connection.vendor == 'sqlite':
+            # "SCAN table" reads every row; "SCAN table USING INDEX" walks an index in order
+            return line.startswith('SCAN ') and 'USING' not in line and 'VIRTUAL TABLE' not in line
+        return 'Seq Scan' in line
+
+    def handle(self, *args, **options):
+        problems = []
+        for label, queryset, scan_ok in self.representative_queries():
+            plan = self.explain(queryset)
+            scans = [line for line in plan if self.is_full_scan(line)]
+            if scans and not scan_ok:
+                problems.append(label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {label}"))
+            for line in plan:
+                self.stdout.write(f"             {line}")
+
+        if problems and options['strict']:
+            raise CommandError(f"Full table scans in: {', '.join(problems)}")
+        self.stdout.write(f"{len(problems)} queries with full table scans")
@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from destination.models import Category, Destination, DestinationImage
+from destination.serializers import DestinationSerializer
+from schedule.models import Tour
+from schedule.serializers import TourSerializer
+
+
+def build_rows(count, images_per_destination=2):
+    """Unsaved destinations and tours with their relations cached, so only serialization is timed"""
+    now = timezone.now()
+    category = Category(pk=1, name='camping', slug='camping')
+    user = get_user_model()(pk=1)
+    destinations, tours = [], []
+    for i in range(count):
+        destination = Destination(
+            pk=i + 1, name=f"Destination {i}", slug=f"destination-{i}", description='Somewhere',
+            category=category, city='Lahore', address=f"{i} Mall Road",
+            latitude=Decimal('31.520367'), longitude=Decimal('74.358749'),
+            geocode_status='done', created_at=now, updated_at=now,
+        )
+        destination._prefetched_objects_cache = {'images': [
+            DestinationImage(
+                pk=i * images_per_destination + j + 1, destination=destination,
+                image=f"destinations/{i}_{j}.jpg", is_primary=j == 0, created_at=now,
+                variants={'webp': {'320': f"destinations/derivatives/{i}_{j}_320.webp"}},
+            )
+            for j in range(images_per_destination)
+        ]}
+        destinations.append(destination)
+        tours.append(Tour(
+            pk=i + 1, user=user, title=f"Tour {i}", description='Trip', destination=destination,
+            start_date=now + timedelta(days=7), end_date=now + timedelta(days=9),
+            price=Decimal('250.00'), adults=2, children=1, kids=0, created_at=now, updated_at=now,
+        ))
+    return destinations, tours
+
+
+class Command(BaseCommand):
+    help = 'Time stock DRF serialization against the compiled read path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported')
+
+    def time_render(self, serializer_class, rows, request, repeat, compiled):
+        best, payload = None, None
+        with override_settings(COMPILED_SERIALIZERS=compiled):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = serializer_class(rows, many=True, context={'request': request}).data
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+                payload = JSONRenderer().render(data)
+        return best, payload
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/destinations/destinations/'))
+        for count in options['rows']:
+            destinations, tours = build_rows(count)
+            for label, serializer_class, rows in [
+                ('destinations', DestinationSerializer, destinations),
+                ('tours', TourSerializer, tours),
+            ]:
+                stock, expected = self.time_render(serializer_class, rows, request, options['repeat'], False)
+                compiled, actual = self.time_render(serializer_class, rows, request, options['repeat'], True)
+                identical = 'identical' if actual == expected else 'MISMATCH'
+                self.stdout.write(
+                    f"{label:<12} {count:>6} rows  stock {stock * 1000:8.1f} ms  "
+                    f"compiled {compiled * 1000:8.1f} ms  {stock / compiled:4.1f}x  {identical}"
+                )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from destination.images import generate_derivatives, pending_images
+from destination.models import DestinationImage
+
+
+class Command(BaseCommand):
+    help = 'Create resized WebP/AVIF/JPEG copies of queued destination images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate every image, not just queued ones')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry images that failed before')
+        parser.add_argument('--watch', action='store_true', help='Keep polling for new uploads instead of exiting')
+        parser.add_argument('--idle-sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=None, help='Process pool size')
+
+    def handle(self, *args, **options):
+        if options['force']:
+            images = DestinationImage.objects.order_by('id')
+        elif options['retry_failed']:
+            images = DestinationImage.objects.filter(derivatives_status__in=['pending', 'failed']).order_by('id')
+        else:
+            images = pending_images()
+
+        started = time.monotonic()
+        totals = {'done': 0, 'failed': 0}
+        last_id = 0
+        try:
+            while True:
+                # Rows are updated as we go, so page by id rather than holding a cursor open
+                batch = list(images.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    if not options['watch']:
+                        break
+                    time.sleep(options['idle_sleep'])
+                    # --force and --retry-failed only apply to the first pass
+                    images, last_id = pending_images(), 0
+                    continue
+                last_id = batch[-1].pk
+                rendered = generate_derivatives(batch, workers=options['workers'])
+                totals['done'] += rendered
+                totals['failed'] += len(batch) - rendered
+                for image in batch:
+                    if image.derivatives_status == 'failed':
+                        self.stdout.write(self.style.WARNING(f"Image {image.pk} ({image.image.name}): failed"))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated derivatives for {totals['done']} images, {totals['failed']} failed, "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from destination.models import GeocodeCacheEntry
+
+
+class Command(BaseCommand):
+    help = 'Show or prune the persistent geocode cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear-negative', action='store_true', help='Forget cached "address not found" results')
+        parser.add_argument('--clear', action='store_true', help='Delete every cache entry')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = GeocodeCacheEntry.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cache entries"))
+        elif options['clear_negative']:
+            deleted, _ = GeocodeCacheEntry.objects.filter(found=False).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} negative cache entries"))
+
+        entries = GeocodeCacheEntry.objects.all()
+        self.stdout.write(
+            f"Found: {entries.filter(found=True).count()}, "
+            f"not found: {entries.filter(found=False, expires_at__gt=timezone.now()).count()}, "
+            f"expired: {entries.filter(found=False, expires_at__lte=timezone.now()).count()}"
+        )
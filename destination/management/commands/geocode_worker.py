@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from destination.geocoding import claim_jobs, geocode_cache, process_job
+
+
+class Command(BaseCommand):
+    help = 'Process pending destination geocoding jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--batch-size', type=int, default=10, help='Number of jobs to lease at a time')
+        parser.add_argument('--idle-sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        totals = {'done': 0, 'retry': 0, 'failed': 0}
+
+        try:
+            while True:
+                jobs = claim_jobs(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['idle_sleep'])
+                    continue
+
+                for job in jobs:
+                    outcome = process_job(job)
+                    totals[outcome] += 1
+                    self.stdout.write(f"{job.address}: {outcome}")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {totals['done']}, retrying {totals['retry']}, failed {totals['failed']}"
+        ))
+        stats = geocode_cache.stats
+        self.stdout.write(
+            f"Cache: {stats['memory_hits']} memory hits, {stats['db_hits']} database hits "
+            f"({stats['negative_hits']} negative), {stats['misses']} misses"
+        )
@@ -0,0 +1,183 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from destination.cache import invalidate
+from destination.models import Category, Destination, GeocodeJob, normalize_name
+
+FIELDS = ['name', 'description', 'city', 'address', 'latitude', 'longitude']
+COORDINATE_PLACES = Decimal('0.000001')
+
+
+def read_rows(path, fmt):
+    """Rows as dicts from a CSV file, a JSON array, or NDJSON (one object per line)"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+class SlugAllocator:
+    """Unique slugs checked against one up-front load of the existing ones"""
+
+    def __init__(self, taken):
+        self.taken = set(taken)
+
+    def allocate(self, name):
+        base = slugify(name)[:45] or 'destination'
+        slug, suffix = base, 2
+        while slug in self.taken:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        self.taken.add(slug)
+        return slug
+
+
+class Command(BaseCommand):
+    help = 'Bulk import destinations from CSV, JSON or NDJSON; geocoding is queued rather than done inline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT and transaction')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows instead of aborting')
+        parser.add_argument('--geocode', action='store_true', help='Geocode the queued rows after importing')
+
+    def category_key(self, value):
+        """(name, custom_name, slug) for a category given by key, label or slug"""
+        value = ' '.join(str(value or '').split())
+        fold = lambda text: ' '.join(text.lower().replace('-', ' ').replace('_', ' ').split())
+        for key, label in Category.CATEGORY_CHOICES:
+            if fold(value) in (fold(key), fold(label)) and key != 'other':
+                return key, None, slugify(key)
+        return 'other', value, slugify(value)
+
+    def validate(self, rows):
+        valid, errors = [], []
+        for line, row in enumerate(rows, start=1):
+            destination = Destination(**{
+                field: (row.get(field) if row.get(field) not in ('', None) else None)
+                for field in FIELDS if field in row
+            })
+            if destination.city is None:
+                destination.city = Destination._meta.get_field('city').default
+            problems = []
+            for field, limit in (('latitude', 90), ('longitude', 180)):
+                value = getattr(destination, field)
+                if value is None:
+                    continue
+                try:
+                    # The rounding save() would apply, so 7-decimal GPS values are accepted
+                    value = Decimal(str(value).strip()).quantize(COORDINATE_PLACES)
+                except InvalidOperation:
+                    continue  # Left for clean_fields() to report
+                setattr(destination, field, value)
+                if not -limit <= value <= limit:
+                    problems.append(f'{field}: must be between -{limit} and {limit}')
+            try:
+                # Model field validation only: no uniqueness or foreign-key queries
+                destination.clean_fields(exclude=['category', 'slug', 'geocode_status'])
+            except ValidationError as e:
+                problems.extend(f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items())
+            category = self.category_key(row.get('category'))
+            if not category[2]:
+                problems.append('category: this field is required')
+
+            if problems:
+                errors.append((line, problems))
+            else:
+                valid.append((destination, category))
+        return valid, errors
+
+    def upsert_categories(self, keys):
+        """Slug -> Category for every key, creating the missing ones in one INSERT"""
+        keys = {slug: (name, custom_name) for name, custom_name, slug in keys}
+        categories = Category.objects.in_bulk(keys, field_name='slug')
+        missing = [
+            Category(name=name, custom_name=custom_name, slug=slug)
+            for slug, (name, custom_name) in keys.items() if slug not in categories
+        ]
+        if missing:
+            Category.objects.bulk_create(missing)
+            categories.update(Category.objects.in_bulk([c.slug for c in missing], field_name='slug'))
+        return categories, len(missing)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in ('csv', 'json', 'ndjson'):
+            raise CommandError('Cannot tell the format from the extension; pass --format')
+
+        started = time.perf_counter()
+        try:
+            valid, errors = self.validate(read_rows(path, fmt))
+        except (ValueError, TypeError, AttributeError, csv.Error) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+        for line, problems in errors[:20]:
+            self.stderr.write(f'Row {line}: {"; ".join(problems)}')
+        if errors and not options['skip_invalid']:
+            raise CommandError(f'{len(errors)} invalid rows; fix them or pass --skip-invalid')
+
+        categories, created_categories = self.upsert_categories(category for _, category in valid)
+        slugs = SlugAllocator(Destination.objects.values_list('slug', flat=True))
+        queued = 0
+
+        for start in range(0, len(valid), batch_size):
+            batch = []
+            for destination, (_, _, category_slug) in valid[start:start + batch_size]:
+                destination.category = categories[category_slug]
+                destination.slug = slugs.allocate(destination.name)
+                # bulk_create skips save(), so set what save() would
+                destination.name_key = normalize_name(destination.name)
+                needs_geocode = destination.latitude is None or destination.longitude is None
+                destination.geocode_status = 'pending' if needs_geocode else 'done'
+                batch.append(destination)
+
+            with transaction.atomic():
+                Destination.objects.bulk_create(batch)
+                if any(destination.pk is None for destination in batch):
+                    # Backends that can't return ids from a bulk INSERT
+                    ids = dict(Destination.objects.filter(slug__in=[d.slug for d in batch]).values_list('slug', 'id'))
+                    for destination in batch:
+                        destination.pk = ids[destination.slug]
+                now = timezone.now()
+                jobs = [
+                    GeocodeJob(destination=destination, address=destination.address, run_after=now)
+                    for destination in batch if destination.geocode_status == 'pending'
+                ]
+                GeocodeJob.objects.bulk_create(jobs)
+                queued += len(jobs)
+
+        # Bulk inserts skip the signals that normally invalidate cached lists
+        invalidate()
+        elapsed = time.perf_counter() - started
+        rate = len(valid) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(valid)} destinations ({len(errors)} skipped, {created_categories} new categories) '
+            f'in {elapsed:.2f}s, {rate:.0f} rows/sec; {queued} queued for geocoding'
+        ))
+
+        if queued:
+            if options['geocode']:
+                call_command('geocode_worker', once=True, batch_size=50, stdout=self.stdout, stderr=self.stderr)
+            else:
+                self.stdout.write('Run "python manage.py geocode_worker --once" to geocode them')
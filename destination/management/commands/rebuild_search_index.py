@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from destination import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for destinations'
+
+    def handle(self, *args, **options):
+        if not search.rebuild():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite with FTS5; falling back to icontains'))
+            return
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+def queue_existing_destinations(apps, schema_editor):
+    Destination = apps.get_model('destination', 'Destination')
+    GeocodeJob = apps.get_model('destination', 'GeocodeJob')
+
+    # Rows that already have coordinates don't need the worker
+    Destination.objects.filter(latitude__isnull=False, longitude__isnull=False).update(geocode_status='done')
+
+    pending = Destination.objects.filter(geocode_status='pending')
+    GeocodeJob.objects.bulk_create(
+        GeocodeJob(destination=destination, address=destination.address)
+        for destination in pending
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0006_destination_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeThrottle',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_allowed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending geocode'), ('done', 'Geocoded'), ('failed', 'Geocoding failed')], default='pending', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='GeocodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='geocode_job', to='destination.destination')),
+            ],
+            options={
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='geocodejob_status_run_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing_destinations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0008_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['latitude', 'longitude'], name='destination_lat_lon_idx'),
+        ),
+    ]
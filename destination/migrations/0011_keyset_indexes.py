@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0010_destination_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['-created_at', '-id'], name='destination_created_id_idx'),
+        ),
+    ]
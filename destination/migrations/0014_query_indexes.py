@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0013_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['category', '-created_at'], name='destination_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(django.db.models.functions.text.Lower('city'), name='destination_city_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='destination_name_lower_idx'),
+        ),
+    ]
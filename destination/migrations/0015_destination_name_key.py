@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:03
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    # Copy of destination.models.normalize_name as of this migration
+    return ' '.join(unicodedata.normalize('NFKC', name or '').casefold().split())
+
+
+def fill_name_keys(apps, schema_editor):
+    Destination = apps.get_model('destination', 'Destination')
+    destinations = list(Destination.objects.only('id', 'name'))
+    for destination in destinations:
+        destination.name_key = normalize_name(destination.name)
+    Destination.objects.bulk_update(destinations, ['name_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0014_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='destination',
+            name='destination_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['name_key'], name='destination_name_key_idx'),
+        ),
+    ]
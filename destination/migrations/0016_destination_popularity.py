@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0015_destination_name_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destination',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='popularity_activity',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='popularity_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='tour_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['-popularity', '-id'], name='destination_popularity_idx'),
+        ),
+    ]
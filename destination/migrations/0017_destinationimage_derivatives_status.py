@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+
+def mark_rendered(apps, schema_editor):
+    DestinationImage = apps.get_model('destination', 'DestinationImage')
+    DestinationImage.objects.exclude(variants={}).update(derivatives_status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0016_destination_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destinationimage',
+            name='derivatives_status',
+            field=models.CharField(choices=[('pending', 'Pending derivatives'), ('done', 'Derivatives generated'), ('failed', 'Derivatives failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.RunPython(mark_rendered, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='destinationimage',
+            index=models.Index(fields=['derivatives_status', 'id'], name='image_derivatives_status_idx'),
+        ),
+    ]
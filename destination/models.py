@@ -1,8 +1,9 @@
-from django.db import models
+import unicodedata
+
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.text import slugify
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-import time
 
 class Category(models.Model):
     CATEGORY_CHOICES = [
@@ -18,6 +19,7 @@ class Category(models.Model):
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -31,8 +33,25 @@ class Category(models.Model):
         verbose_name_plural = "Categories"
         ordering = ['name']
 
+def normalize_name(name):
+    """
+    Lookup key for a destination name: Unicode-normalized, case-folded and
+    with runs of whitespace collapsed, so "Lahore  Fort" and "LAHORE fort"
+    resolve to the same destination. SQLite's LOWER() only folds ASCII.
+    """
+    return ' '.join(unicodedata.normalize('NFKC', name or '').casefold().split())
+
+
 class Destination(models.Model):
+    GEOCODE_STATUS_CHOICES = [
+        ('pending', 'Pending geocode'),
+        ('done', 'Geocoded'),
+        ('failed', 'Geocoding failed'),
+    ]
+
     name = models.CharField(max_length=200)
+    # normalize_name(name), kept in step by save(); DestinationField resolves names on it
+    name_key = models.CharField(max_length=200, editable=False, default='')
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='destinations')
@@ -40,44 +59,198 @@ class Destination(models.Model):
     address = models.CharField(max_length=255)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geocode_status = models.CharField(max_length=10, choices=GEOCODE_STATUS_CHOICES, default='pending')
+    # Live totals over this destination's tours, kept by schedule.stats
+    tour_count = models.PositiveIntegerField(default=0, editable=False)
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    # Time-decayed score for ?ordering=popular, recomputed by destination.popularity
+    popularity = models.FloatField(default=0, editable=False)
+    popularity_activity = models.FloatField(default=0, editable=False)  # Activity already folded into popularity
+    popularity_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def get_coordinates(self):
-        """Fetch coordinates using OpenStreetMap's Nominatim service"""
-        geolocator = Nominatim(user_agent="nomadic_travel")
-        try:
-            # Add a small delay to respect Nominatim's usage policy
-            time.sleep(1)
-            location = geolocator.geocode(self.address)
-            if location:
-                return location.latitude, location.longitude
-        except (GeocoderTimedOut, GeocoderUnavailable) as e:
-            print(f"Geocoding error: {e}")
-        return None, None
+    # Written with queryset updates elsewhere; a full save() must not overwrite them
+    COUNTER_FIELDS = ('tour_count', 'participant_count', 'popularity', 'popularity_activity', 'popularity_updated_at')
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        
-        # Only fetch coordinates if they're not already set
-        if not self.latitude or not self.longitude:
-            lat, lon = self.get_coordinates()
-            if lat and lon:
-                self.latitude = lat
-                self.longitude = lon
-        
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        elif update_fields is None and not self._state.adding and not args:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
+        # Coordinates are filled in later by the geocode worker so that
+        # saving never blocks on Nominatim
+        needs_geocode = self.latitude is None or self.longitude is None
+        self.geocode_status = 'pending' if needs_geocode else 'done'
+
         super().save(*args, **kwargs)
 
+        if needs_geocode:
+            GeocodeJob.enqueue(self)
+
+    @classmethod
+    def touch(cls, ids):
+        """Bump ``updated_at`` for rows whose API representation changed indirectly"""
+        from .cache import invalidate
+
+        rows = cls.objects.filter(pk__in=ids)
+        rows.update(updated_at=timezone.now())
+        invalidate(rows.values_list('slug', flat=True))
+
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for nearby searches
+            models.Index(fields=['latitude', 'longitude'], name='destination_lat_lon_idx'),
+            # Default ordering and keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='destination_created_id_idx'),
+            # ?category= listing, newest first
+            models.Index(fields=['category', '-created_at'], name='destination_cat_created_idx'),
+            # Case-insensitive ?city= filter
+            models.Index(Lower('city'), name='destination_city_lower_idx'),
+            # Destination references by name (destination.resolver)
+            models.Index(fields=['name_key'], name='destination_name_key_idx'),
+            # ?ordering=popular and its keyset pages
+            models.Index(fields=['-popularity', '-id'], name='destination_popularity_idx'),
+        ]
+
 class DestinationImage(models.Model):
+    DERIVATIVES_STATUS_CHOICES = [
+        ('pending', 'Pending derivatives'),
+        ('done', 'Derivatives generated'),
+        ('failed', 'Derivatives failed'),
+    ]
+
     destination = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='destinations/')
     caption = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
+    # Resized copies written by destination.images: {format: {width: storage name}}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # New and replaced images wait here for the generate_image_derivatives worker
+    derivatives_status = models.CharField(
+        max_length=10, choices=DERIVATIVES_STATUS_CHOICES, default='pending', editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.destination.name}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['derivatives_status', 'id'], name='image_derivatives_status_idx'),
+        ]
+
+    @classmethod
+    def bulk_add(cls, destination, files, captions=(), primary_index=None):
+        """
+        Store ``files`` for ``destination`` and insert their rows in one
+        transaction. The file at ``primary_index`` replaces any existing
+        primary image. If the insert fails, the stored files are removed again.
+        """
+        field = cls._meta.get_field('image')
+        storage = field.storage
+
+        # Stream uploads to storage before taking the database write lock
+        names = [storage.save(field.generate_filename(None, f.name), f) for f in files]
+        images = [
+            cls(
+                destination=destination,
+                image=name,
+                caption=captions[i] if i < len(captions) else '',
+                is_primary=i == primary_index,
+            )
+            for i, name in enumerate(names)
+        ]
+
+        try:
+            with transaction.atomic():
+                if primary_index is not None:
+                    cls.objects.filter(destination=destination, is_primary=True).update(is_primary=False)
+                created = cls.objects.bulk_create(images)
+                Destination.touch([destination.pk])
+                return created
+        except Exception:
+            for name in names:
+                storage.delete(name)
+            raise
+
+
+class GeocodeJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    destination = models.OneToOneField(Destination, on_delete=models.CASCADE, related_name='geocode_job')
+    address = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def enqueue(cls, destination):
+        """(Re)queue a destination for geocoding, resetting any previous attempt"""
+        job, _ = cls.objects.update_or_create(
+            destination=destination,
+            defaults={
+                'address': destination.address,
+                'status': 'pending',
+                'attempts': 0,
+                'run_after': timezone.now(),
+                'locked_at': None,
+                'last_error': '',
+            }
+        )
+        return job
+
+    def __str__(self):
+        return f"Geocode {self.address} ({self.status})"
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='geocodejob_status_run_idx'),
+        ]
+
+class GeocodeThrottle(models.Model):
+    """Shared request slot so every worker process honours the provider's rate limit"""
+    key = models.CharField(max_length=50, primary_key=True)
+    next_allowed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.key
+
+
+class GeocodeCacheEntry(models.Model):
+    """Geocoding result for a normalized address; misses are kept too, until ``expires_at``"""
+    address_key = models.CharField(max_length=255, unique=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    found = models.BooleanField(default=True)
+    source = models.CharField(max_length=50, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.address_key
+
+    class Meta:
+        verbose_name_plural = "Geocode cache entries"
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import Destination
+
+DEFAULTS = {
+    'HALF_LIFE_DAYS': 30,  # A booking counts half as much after this many days
+    'TOUR_WEIGHT': 1.0,  # Score added per tour
+    'PARTICIPANT_WEIGHT': 0.5,  # Score added per traveller on those tours
+    'BATCH_SIZE': 1000,
+}
+
+
+def popularity_setting(name):
+    return getattr(settings, 'POPULARITY', {}).get(name, DEFAULTS[name])
+
+
+def activity(tour_count, participant_count):
+    """Undecayed score of a destination's tours; grows as tours are booked"""
+    return popularity_setting('TOUR_WEIGHT') * tour_count + popularity_setting('PARTICIPANT_WEIGHT') * participant_count
+
+
+def recompute(now=None):
+    """
+    Decay every score by the time since it was last computed, then add the
+    activity since then: the growth of the tour counters that schedule.stats
+    maintains. Tour history is never rescanned, so a run costs one pass over
+    the destinations with a score or new activity. Returns the rows updated.
+    """
+    now = now or timezone.now()
+    half_life = popularity_setting('HALF_LIFE_DAYS') * 86400
+    rows = Destination.objects.exclude(
+        popularity=0, popularity_activity=0, tour_count=0, participant_count=0
+    ).only('id', 'tour_count', 'participant_count', 'popularity', 'popularity_activity', 'popularity_updated_at')
+
+    changed = []
+    for destination in rows.iterator(chunk_size=popularity_setting('BATCH_SIZE')):
+        elapsed = (now - destination.popularity_updated_at).total_seconds() if destination.popularity_updated_at else 0
+        current = activity(destination.tour_count, destination.participant_count)
+        # Cancellations make the new activity negative; the score never drops below zero
+        score = max(0.0, destination.popularity * 0.5 ** (max(elapsed, 0) / half_life) + current - destination.popularity_activity)
+        score = round(score, 6)
+        if score == destination.popularity and current == destination.popularity_activity:
+            continue
+        destination.popularity, destination.popularity_activity, destination.popularity_updated_at = score, current, now
+        changed.append(destination)
+
+    with transaction.atomic():
+        Destination.objects.bulk_update(
+            changed, ['popularity', 'popularity_activity', 'popularity_updated_at'],
+            batch_size=popularity_setting('BATCH_SIZE'),
+        )
+    if changed:
+        # Popular-first lists reorder; destination payloads don't include the score
+        invalidate()
+    return len(changed)
@@ -0,0 +1,84 @@
+from django.db.models import Q
+
+from .models import Destination, normalize_name
+
+
+def is_id(reference):
+    return isinstance(reference, int) and not isinstance(reference, bool)
+
+
+class DestinationResolver:
+    """
+    Turns destination references (ids, or names matched on ``name_key``) into
+    Destination rows. ``prime()`` loads every reference not seen yet with one
+    ``IN`` query; answers, including misses, are remembered, so each reference
+    is queried at most once in the resolver's lifetime.
+    """
+
+    def __init__(self, queryset=None):
+        self.queryset = Destination.objects.all() if queryset is None else queryset
+        self.by_id = {}
+        self.by_key = {}  # name_key -> list of destinations sharing it
+
+    def prime(self, references):
+        ids, keys = set(), set()
+        for reference in references:
+            if is_id(reference) and reference not in self.by_id:
+                ids.add(reference)
+            elif isinstance(reference, str) and normalize_name(reference) not in self.by_key:
+                keys.add(normalize_name(reference))
+        if not ids and not keys:
+            return
+
+        self.by_id.update(dict.fromkeys(ids))
+        self.by_key.update((key, []) for key in keys)
+        for destination in self.queryset.filter(Q(id__in=ids) | Q(name_key__in=keys)).order_by('id'):
+            if destination.id in ids:
+                self.by_id[destination.id] = destination
+            if destination.name_key in keys:
+                self.by_key[destination.name_key].append(destination)
+
+    def loaded(self):
+        """Every destination found so far"""
+        found = {destination.id: destination for destination in self.by_id.values() if destination is not None}
+        for matches in self.by_key.values():
+            found.update((destination.id, destination) for destination in matches)
+        return list(found.values())
+
+    def resolve(self, reference):
+        """
+        The destination ``reference`` points to, or None. A name shared by
+        several destinations raises ``Destination.MultipleObjectsReturned``.
+        """
+        self.prime([reference])
+        if is_id(reference):
+            return self.by_id[reference]
+        if not isinstance(reference, str):
+            return None
+        matches = self.by_key[normalize_name(reference)]
+        if len(matches) > 1:
+            raise Destination.MultipleObjectsReturned(
+                f"{len(matches)} destinations are named '{reference}'; use the destination ID"
+            )
+        return matches[0] if matches else None
+
+
+def resolver_for(request, queryset=None):
+    """
+    The resolver memoized on ``request``, so every serializer and view in one
+    request shares its lookups; a fresh one when there is no request.
+    ``queryset`` only applies when the resolver is created.
+    """
+    if request is None:
+        return DestinationResolver(queryset)
+    resolver = getattr(request, '_destination_resolver', None)
+    if resolver is None:
+        resolver = request._destination_resolver = DestinationResolver(queryset)
+    return resolver
+
+
+def context_resolver(context):
+    """The resolver shared by everything validated under a serializer ``context``"""
+    if 'destination_resolver' not in context:
+        context['destination_resolver'] = resolver_for(context.get('request'))
+    return context['destination_resolver']
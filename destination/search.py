@@ -0,0 +1,135 @@
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 index over destination_destination. It is an external-content
+# table, so only the index is stored, and triggers keep it in sync with every
+# write, including bulk_create() and queryset.update().
+FTS_TABLE = 'destination_search'
+CONTENT_TABLE = 'destination_destination'
+FTS_COLUMNS = ['name', 'description', 'address', 'city']
+# bm25() weights, in FTS_COLUMNS order: a hit in the name matters most
+FTS_WEIGHTS = [10.0, 1.0, 2.0, 5.0]
+
+_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns}, content='{CONTENT_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def install(using_connection=connection, rebuild=False):
+    """
+    Create the index and its triggers if missing. Safe to run repeatedly; it is
+    re-run after every migrate because SQLite table rebuilds drop triggers.
+    Returns False when the database has no FTS5 support.
+    """
+    if using_connection.vendor != 'sqlite':
+        return False
+    try:
+        with using_connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM sqlite_master WHERE name = '{FTS_TABLE}'")
+            created = cursor.fetchone() is None
+            for statement in CREATE_SQL:
+                cursor.execute(statement)
+            if created or rebuild:
+                cursor.execute(REBUILD_SQL)
+    except OperationalError:
+        return False
+    return True
+
+
+def uninstall(using_connection=connection):
+    if using_connection.vendor != 'sqlite':
+        return
+    with using_connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(using_connection=connection):
+    """Drop and recreate the index from the current destination rows"""
+    uninstall(using_connection)
+    return install(using_connection, rebuild=True)
+
+
+def install_search_index(sender, using='default', **kwargs):
+    """post_migrate receiver"""
+    from django.db import connections
+    install(connections[using])
+
+
+_available = None
+
+
+def is_available():
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT 1 FROM sqlite_master WHERE name = '{FTS_TABLE}'")
+                _available = cursor.fetchone() is not None
+    return _available
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def search(queryset, text):
+    """
+    Filter ``queryset`` to destinations matching ``text`` and annotate a
+    ``search_rank`` (lower is better). Falls back to icontains scans, with a
+    constant rank, where FTS5 isn't available or ``text`` has no words to
+    match on (e.g. "!!!"), which is what the search did before FTS5.
+    """
+    match = build_match_query(text)
+    if not match or not is_available():
+        return queryset.filter(
+            Q(name__icontains=text) |
+            Q(description__icontains=text) |
+            Q(address__icontains=text) |
+            Q(city__icontains=text)
+        ).annotate(search_rank=Value(0.0))
+
+    table = queryset.model._meta.db_table
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match],
+            output_field=FloatField()
+        )
+    )
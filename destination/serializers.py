@@ -1,17 +1,25 @@
 from rest_framework import serializers
+from nomadic_travel.serializers import CompiledListSerializer, CompiledRepresentationMixin, SparseFieldsMixin
 from .models import Category, Destination, DestinationImage
+from .images import build_srcset
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'created_at']
 
-class DestinationImageSerializer(serializers.ModelSerializer):
+class DestinationImageSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = DestinationImage
-        fields = ['id', 'image', 'caption', 'is_primary', 'created_at']
+        fields = ['id', 'image', 'srcset', 'caption', 'is_primary', 'created_at']
+        list_serializer_class = CompiledListSerializer
+
+    def get_srcset(self, obj):
+        return build_srcset(obj.variants, self.context.get('request'))
 
-class DestinationSerializer(serializers.ModelSerializer):
+class DestinationSerializer(CompiledRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
     images = DestinationImageSerializer(many=True, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
 
@@ -19,5 +27,8 @@ class DestinationSerializer(serializers.ModelSerializer):
         model = Destination
         fields = [
             'id', 'name', 'description', 'category_name',
-            'city', 'address', 'latitude', 'longitude', 'images', 'created_at', 'updated_at'
-        ] 
\ No newline at end of file
+            'city', 'address', 'latitude', 'longitude', 'geocode_status', 'images', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['geocode_status']
+        list_serializer_class = CompiledListSerializer
+    expandable_fields = ['images'] 
\ No newline at end of file
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import Category, Destination, DestinationImage
+
+
+@receiver([post_save, post_delete], sender=DestinationImage)
+def touch_destination_on_image_change(sender, instance, **kwargs):
+    # Images are embedded in the destination payload, so its validators must change
+    Destination.touch([instance.destination_id])
+
+
+@receiver(pre_save, sender=DestinationImage)
+def requeue_replaced_image(sender, instance, **kwargs):
+    # Derivatives of the old file no longer match; the worker renders the new one
+    if instance.pk and sender.objects.filter(pk=instance.pk).exclude(image=instance.image.name).exists():
+        instance.variants = {}
+        instance.derivatives_status = 'pending'
+
+
+@receiver(pre_save, sender=Destination)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Destination)
+def invalidate_destination_on_save(sender, instance, **kwargs):
+    invalidate([slug for slug in (instance.slug, getattr(instance, '_previous_slug', None)) if slug])
+
+
+@receiver(post_delete, sender=Destination)
+def invalidate_destination_on_delete(sender, instance, **kwargs):
+    invalidate([instance.slug])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_destinations(sender, instance, **kwargs):
+    # category_name appears in every destination of the category; one counter
+    # covers them all, however many there are
+    invalidate(categories=True)
@@ -1,3 +1,976 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from math import asin, cos, radians, sin, sqrt
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from geopy.exc import GeocoderServiceError
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from nomadic_travel import serializers as serializers_module
+from nomadic_travel.renderers import FastJSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from schedule.models import Tour
+from . import cache as cache_module, geo, geocoding, popularity, search
+from .images import supported_formats
+from .management.commands.audit_indexes import Command as AuditIndexes
+from .models import Category, Destination, DestinationImage, GeocodeCacheEntry, GeocodeJob, GeocodeThrottle
+from .serializers import DestinationSerializer
+
+
+class QueryBudgetMixin:
+    """
+    Assert that an endpoint runs a fixed number of queries however many rows
+    it returns, so N+1 regressions fail the build.
+    """
+
+    def assertQueryBudget(self, budget, url, row_counts, create_rows, **params):
+        for count in row_counts:
+            create_rows(count)
+            with self.subTest(rows=count), self.assertNumQueries(budget):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+
+
+def create_destinations(category, count, images_per_destination=2):
+    destinations = []
+    for i in range(Destination.objects.count(), count):
+        destination = Destination.objects.create(
+            name=f"Destination {i}",
+            description="Somewhere",
+            category=category,
+            address=f"{i} Mall Road",
+            latitude=31.5,
+            longitude=74.3,
+        )
+        for j in range(images_per_destination):
+            DestinationImage.objects.create(
+                destination=destination,
+                image=f"destinations/{i}_{j}.jpg",
+                is_primary=j == 0,
+            )
+        destinations.append(destination)
+    return destinations
+
+
+class DestinationQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='camping')
+
+    def create_rows(self, count):
+        create_destinations(self.category, count)
+
+    def test_list_query_budget(self):
+        # ETag aggregate, COUNT(*), destinations joined with category, images
+        self.assertQueryBudget(4, '/api/destinations/destinations/', [1, 5, 10, 25], self.create_rows)
+
+    def test_filtered_list_query_budget(self):
+        self.assertQueryBudget(
+            4, '/api/destinations/destinations/', [1, 10], self.create_rows,
+            category='camping', city='lahore'
+        )
+
+    def test_retrieve_query_budget(self):
+        self.create_rows(3)
+        destination = Destination.objects.first()
+        # ETag validators, destination joined with category, images
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/destinations/destinations/{destination.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['images']), 2)
+
+    def test_not_modified_skips_serialization(self):
+        self.create_rows(5)
+        url = '/api/destinations/destinations/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(DESTINATION_CACHE={'ALIAS': 'destinations', 'TIMEOUT': 300})
+class DestinationResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['destinations'].clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='camping')
+        self.destination = create_destinations(self.category, 3)[0]
+
+    def test_hit_skips_database_and_signals_invalidate(self):
+        url = f'/api/destinations/destinations/{self.destination.slug}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], self.destination.name)
+
+        self.destination.name = 'Renamed'
+        self.destination.save()
+        self.assertEqual(self.client.get(url).data['name'], 'Renamed')
+
+        self.client.get('/api/destinations/destinations/', {'city': 'Lahore'})
+        with self.assertNumQueries(0):
+            self.client.get('/api/destinations/destinations/', {'city': ' LAHORE'})
+        self.category.description = 'Tents'
+        self.category.save()
+        with self.assertNumQueries(4):
+            self.client.get('/api/destinations/destinations/', {'city': 'lahore'})
+
+    def test_category_change_costs_two_counter_bumps(self):
+        create_destinations(self.category, 30, images_per_destination=0)
+        url = f'/api/destinations/destinations/{self.destination.slug}/'
+        self.assertEqual(self.client.get(url).data['category_name'], 'camping')
+        self.category.name = 'national_park'
+        with mock.patch('destination.cache._bump', wraps=cache_module._bump) as bump:
+            self.category.save()
+        # The list and category generations, not one per destination
+        self.assertEqual(bump.call_count, 2)
+        self.assertEqual(self.client.get(url).data['category_name'], 'national_park')
+
+
+@override_settings(DESTINATION_CACHE={'ALIAS': 'destinations', 'TIMEOUT': 300})
+class SharedResponseCacheTests(TransactionTestCase):
+    """Invalidations from another process reach this one through the shared cache"""
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.enterContext(override_settings(CACHES={**settings.CACHES, 'destinations': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir,
+        }}))
+        self.env = {
+            **os.environ,
+            'DESTINATION_CACHE_DIR': cache_dir,
+            'SQLITE_PATH': str(settings.DATABASES['default']['NAME']),
+        }
+        self.client = APIClient()
+        self.destinations = create_destinations(Category.objects.create(name='camping'), 2, images_per_destination=0)
+
+    def test_management_command_invalidates_cached_lists(self):
+        url = '/api/destinations/destinations/'
+        first = self.client.get(url, {'ordering': 'popular'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'ordering': 'popular'})['ETag'], first['ETag'])
+
+        start = timezone.now() + timedelta(days=7)
+        Tour.objects.create(
+            title='Trip', description='Trip', destination=self.destinations[1],
+            start_date=start, end_date=start + timedelta(days=1), adults=2,
+        )
+        subprocess.run(
+            [sys.executable, 'manage.py', 'recompute_popularity', '--skip-analyze'],
+            cwd=settings.BASE_DIR, env=self.env, check=True, capture_output=True,
+        )
+        response = self.client.get(url, {'ordering': 'popular'})
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.data['results'][0]['id'], self.destinations[1].pk)
+
+
+class DestinationPopularityTests(TestCase):
+    def setUp(self):
+        caches['destinations'].clear()
+        self.client = APIClient()
+        self.destinations = create_destinations(Category.objects.create(name='camping'), 3, images_per_destination=0)
+        for destination, count in zip(self.destinations, (1, 3, 0)):
+            self.add_tours(destination, count)
+
+    def add_tours(self, destination, count):
+        start = timezone.now() + timedelta(days=7)
+        return [
+            Tour.objects.create(
+                title='Trip', description='Trip', destination=destination,
+                start_date=start, end_date=start + timedelta(days=1), adults=2,
+            )
+            for _ in range(count)
+        ]
+
+    def popular_ids(self, **headers):
+        response = self.client.get('/api/destinations/destinations/', {'ordering': 'popular'}, **headers)
+        return response, [row['id'] for row in response.data['results']] if response.status_code == 200 else None
+
+    def test_counters_follow_tours_and_survive_full_saves(self):
+        stale = Destination.objects.get(pk=self.destinations[1].pk)
+        tour = self.add_tours(self.destinations[1], 1)[0]
+        tour.adults = 5
+        tour.save()
+        stale.name = 'Renamed'
+        stale.save()
+        self.destinations[1].refresh_from_db()
+        self.assertEqual((self.destinations[1].tour_count, self.destinations[1].participant_count), (4, 11))
+        tour.delete()
+        self.destinations[1].refresh_from_db()
+        self.assertEqual((self.destinations[1].tour_count, self.destinations[1].participant_count), (3, 6))
+
+    def test_popular_ordering_changes_with_recompute(self):
+        popularity.recompute()
+        response, ids = self.popular_ids()
+        self.assertEqual(ids, [self.destinations[i].pk for i in (1, 0, 2)])
+
+        # New tours only reorder the list once the scores are recomputed
+        self.add_tours(self.destinations[2], 5)
+        self.assertEqual(self.popular_ids(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+        popularity.recompute()
+        self.assertEqual(self.popular_ids(HTTP_IF_NONE_MATCH=response['ETag'])[1][0], self.destinations[2].pk)
+
+    def test_scores_decay_and_never_go_negative(self):
+        now = timezone.now()
+        popularity.recompute(now)
+        score = Destination.objects.get(pk=self.destinations[1].pk).popularity
+        self.assertEqual(score, 3 * (1.0 + 0.5 * 2))
+        popularity.recompute(now + timedelta(days=30))
+        self.assertAlmostEqual(Destination.objects.get(pk=self.destinations[1].pk).popularity, score / 2)
+
+        Tour.objects.filter(destination=self.destinations[1]).delete()
+        popularity.recompute(now + timedelta(days=31))
+        self.assertEqual(Destination.objects.get(pk=self.destinations[1].pk).popularity, 0)
+
+
+class DestinationSearchTests(TestCase):
+    url = '/api/destinations/destinations/'
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='camping')
+        self.fort = Destination.objects.create(
+            name='Lahore Fort', description='Mughal citadel', category=category, address='Walled City',
+            latitude=31.58, longitude=74.31,
+        )
+        self.museum = Destination.objects.create(
+            name='Museum', description='Near the Lahore Fort gardens', category=category, address='Mall Road',
+            city='Karachi', latitude=31.56, longitude=74.30,
+        )
+
+    def names(self, text):
+        return [row['name'] for row in self.client.get(self.url, {'search': text}).data['results']]
+
+    def test_prefix_matching_and_ranking(self):
+        self.assertTrue(search.is_available())
+        # Every word must match as a prefix; a name hit outranks a description hit
+        self.assertEqual(self.names('lah fo'), ['Lahore Fort', 'Museum'])
+        self.assertEqual(self.names('citadel'), ['Lahore Fort'])
+        self.assertEqual(self.names('fort karachi'), ['Museum'])
+        self.assertEqual(self.names('fortress'), [])
+
+    def test_queries_without_words_use_icontains(self):
+        for text in ['!!!', '---', '"']:
+            with self.subTest(text=text):
+                self.assertEqual(self.names(text), [])
+        self.assertEqual(len(self.names('')), 2)
+
+    def test_triggers_follow_writes(self):
+        self.fort.name = 'Shahi Qila'
+        self.fort.save()
+        self.assertEqual(self.names('qila'), ['Shahi Qila'])
+        self.assertEqual(self.names('citadel'), ['Shahi Qila'])
+        Destination.objects.filter(pk=self.museum.pk).update(description='Art and history')
+        self.assertEqual(self.names('gardens'), [])
+        self.assertEqual(self.names('history'), ['Museum'])
+        self.museum.delete()
+        self.assertEqual(self.names('art'), [])
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.names('citadel'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.names('citadel'), ['Lahore Fort'])
+        self.assertEqual(self.names('lahore'), ['Lahore Fort', 'Museum'])
+
+
+class SparseFieldsTests(TestCase):
+    """Output keys and queries must agree: unrendered relations aren't loaded"""
+    url = '/api/destinations/destinations/'
+
+    def setUp(self):
+        self.client = APIClient()
+        create_destinations(Category.objects.create(name='camping'), 3)
+
+    def test_fields_and_expand(self):
+        full = set(DestinationSerializer.Meta.fields)
+        # ETag aggregate, COUNT(*), destinations joined with category, then images if rendered
+        for params, keys, image_keys, queries in [
+            ({}, full, {'id', 'image', 'srcset', 'caption', 'is_primary', 'created_at'}, 4),
+            ({'fields': 'id,name'}, {'id', 'name'}, None, 3),
+            ({'fields': 'id,name', 'expand': 'images'}, {'id', 'name', 'images'}, {'id', 'image', 'srcset', 'caption', 'is_primary', 'created_at'}, 4),
+            ({'fields': 'id,images.srcset'}, {'id', 'images'}, None, 4),
+            ({'expand': 'images'}, full, {'id', 'image', 'srcset', 'caption', 'is_primary', 'created_at'}, 4),
+            ({'fields': 'name,images'}, {'name', 'images'}, {'id', 'image', 'srcset', 'caption', 'is_primary', 'created_at'}, 4),
+            ({'expand': ''}, full - {'images'}, None, 3),
+        ]:
+            with self.subTest(**params):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(self.url, params)
+                row = response.data['results'][0]
+                self.assertEqual(set(row), keys)
+                if image_keys is not None:
+                    self.assertEqual(set(row['images'][0]), image_keys)
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    url = '/api/destinations/destinations/'
+
+    def setUp(self):
+        self.client = APIClient()
+        create_destinations(Category.objects.create(name='camping'), 25, images_per_destination=0)
+        self.ids = list(Destination.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def follow(self, response, link):
+        """Page ids and the last response, following ``link`` until it runs out"""
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            if not response.data[link]:
+                return pages, response
+            response = self.client.get(response.data[link])
+
+    def test_opt_in(self):
+        self.assertEqual(self.client.get(self.url).data['count'], 25)
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.ids[:10])
+
+    def test_next_and_previous_traversal(self):
+        pages, last = self.follow(self.client.get(self.url, {'pagination': 'cursor'}), 'next')
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), self.ids)
+
+        # Pages keep their rows while new ones arrive; the newest turns up before the first page
+        newest = create_destinations(Category.objects.get(), 26, images_per_destination=0)[0]
+        back, _ = self.follow(last, 'previous')
+        self.assertEqual(back, pages[::-1] + [[newest.pk]])
+
+    def test_tampered_cursors_are_not_found(self):
+        for params in [
+            {'cursor': 'garbage'},
+            {'cursor': cursor(['2024-01-01', 1])},
+            {'cursor': cursor({'v': '2024-01-01T00:00:00Z'})},
+            {'cursor': cursor({'v': 'garbage', 'id': 1})},
+            {'cursor': cursor({'v': None, 'id': 1})},
+            {'cursor': cursor({'v': '2024-01-01T00:00:00Z', 'id': 'x'})},
+            {'cursor': cursor({'v': 'abc', 'id': 1}), 'ordering': 'popular'},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 404)
+
+
+def image_upload(name, size=(400, 200)):
+    data = BytesIO()
+    Image.new('RGB', size, 'teal').save(data, 'PNG')
+    return SimpleUploadedFile(name, data.getvalue(), content_type='image/png')
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVES={'SIZES': [320, 640]}))
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('editor', 'editor@example.com', 'pass'))
+        self.destination = create_destinations(Category.objects.create(name='camping'), 1, images_per_destination=0)[0]
+        self.url = f'/api/destinations/destinations/{self.destination.slug}/'
+
+    def test_uploads_are_queued_and_rendered_by_the_worker(self):
+        response = self.client.post(self.url + 'upload_images/', {'images': [image_upload('fort.png')]}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['images'][0]['srcset'], {})
+        image = DestinationImage.objects.get()
+        self.assertEqual(image.derivatives_status, 'pending')
+
+        call_command('generate_image_derivatives', workers=1, stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.derivatives_status, 'done')
+        formats = supported_formats()
+        # 400px wide: never upscaled to 640
+        self.assertEqual(set(image.variants), set(formats))
+        for fmt, files in image.variants.items():
+            self.assertEqual(list(files), ['320', '400'])
+            for name in files.values():
+                self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, name)))
+        with Image.open(os.path.join(settings.MEDIA_ROOT, image.variants['jpeg']['320'])) as resized:
+            self.assertEqual(resized.size, (320, 160))
+
+        srcset = self.client.get(self.url).data['images'][0]['srcset']
+        self.assertEqual(set(srcset), set(formats))
+        self.assertEqual(
+            srcset['jpeg'],
+            f"http://testserver/media/{image.variants['jpeg']['320']} 320w, "
+            f"http://testserver/media/{image.variants['jpeg']['400']} 400w",
+        )
+
+    def test_broken_images_fail_alone(self):
+        DestinationImage.bulk_add(self.destination, [image_upload('good.png'), image_upload('bad.png')])
+        missing = DestinationImage.objects.create(destination=self.destination, image='destinations/aaa.png')
+        bad = DestinationImage.objects.get(image__contains='bad')
+        with open(bad.image.path, 'wb') as f:
+            f.write(b'not a png')
+
+        out = StringIO()
+        with self.assertLogs('destination.images', 'WARNING'):
+            call_command('generate_image_derivatives', workers=1, stdout=out)
+        self.assertIn('1 images, 2 failed', out.getvalue())
+        statuses = dict(DestinationImage.objects.values_list('pk', 'derivatives_status'))
+        self.assertEqual(sorted(statuses.values()), ['done', 'failed', 'failed'])
+        self.assertEqual((statuses[missing.pk], statuses[bad.pk]), ('failed', 'failed'))
+
+        # Failed images are left alone until retried; a replaced file is queued again
+        call_command('generate_image_derivatives', workers=1, stdout=out)
+        self.assertIn('0 images, 0 failed', out.getvalue())
+        bad.image = DestinationImage.objects.exclude(pk__in=[bad.pk, missing.pk]).get().image.name
+        bad.save()
+        self.assertEqual(DestinationImage.objects.get(pk=bad.pk).derivatives_status, 'pending')
+
+
+class ImportDestinationsTests(TestCase):
+    def import_rows(self, rows, **options):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+        out = StringIO()
+        call_command('import_destinations', path, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def row(self, name, category='camping', **fields):
+        return {'name': name, 'description': 'Somewhere', 'category': category, 'address': 'Mall Road', **fields}
+
+    def test_batch_size_is_checked_before_any_writes(self):
+        with self.assertRaisesMessage(CommandError, '--batch-size must be at least 1'):
+            self.import_rows([self.row('Fort', category='Wine tasting')], batch_size=0)
+        self.assertFalse(Category.objects.exists())
+
+    def test_invalid_rows(self):
+        rows = [self.row('Fort'), self.row('Lake', latitude='95', longitude='74.3'), self.row('')]
+        with self.assertRaisesMessage(CommandError, '2 invalid rows'):
+            self.import_rows(rows)
+        self.assertFalse(Destination.objects.exists())
+
+        out = self.import_rows(rows, skip_invalid=True)
+        self.assertIn('Imported 1 destinations (2 skipped', out)
+        self.assertEqual(list(Destination.objects.values_list('name', flat=True)), ['Fort'])
+
+    def test_slugs_are_unique_across_existing_rows_and_batches(self):
+        create_destinations(Category.objects.create(name='camping'), 1, images_per_destination=0)
+        self.import_rows([self.row('Destination 0'), self.row('Destination 0'), self.row('!!!')], batch_size=1)
+        self.assertEqual(
+            sorted(Destination.objects.values_list('slug', flat=True)),
+            ['destination', 'destination-0', 'destination-0-2', 'destination-0-3'],
+        )
+        self.assertEqual(Destination.objects.get(slug='destination-0-2').name_key, 'destination 0')
+
+    def test_categories_are_matched_by_key_label_or_slug(self):
+        camping = Category.objects.create(name='camping')
+        out = self.import_rows([
+            self.row('Camp', category='Camping'),
+            self.row('Crag', category='rock-climbing'),
+            self.row('Park', category='National Park'),
+            self.row('Vineyard', category='Wine  tasting'),
+            self.row('Cellar', category=' Wine tasting'),
+        ])
+        self.assertIn('3 new categories', out)
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(Destination.objects.get(name='Camp').category, camping)
+        self.assertEqual(Destination.objects.get(name='Crag').category.name, 'rock_climbing')
+        wine = Category.objects.get(slug='wine-tasting')
+        self.assertEqual((wine.name, wine.custom_name), ('other', 'Wine tasting'))
+        self.assertEqual(Destination.objects.filter(category=wine).count(), 2)
+        # National Park already existed after the first import, so a second import adds none
+        self.assertIn('0 new categories', self.import_rows([self.row('Another park', category='national_park')]))
+
+    def test_rows_without_coordinates_are_queued_for_geocoding(self):
+        out = self.import_rows([
+            self.row('Fort', latitude='31.5880000', longitude='74.3100000'),
+            self.row('Lake', address='Lake Road'),
+            self.row('Hill', latitude='31.5'),
+        ], batch_size=2)
+        self.assertIn('2 queued for geocoding', out)
+        self.assertIn('geocode_worker --once', out)
+        statuses = dict(Destination.objects.values_list('name', 'geocode_status'))
+        self.assertEqual(statuses, {'Fort': 'done', 'Lake': 'pending', 'Hill': 'pending'})
+        self.assertEqual(Destination.objects.get(name='Fort').latitude, Decimal('31.588000'))
+        jobs = dict(GeocodeJob.objects.values_list('destination__name', 'address'))
+        self.assertEqual(jobs, {'Lake': 'Lake Road', 'Hill': 'Mall Road'})
+
+
+def compiled_calls():
+    """Record calls into the compiled read path without changing what it returns"""
+    return mock.patch(
+        'nomadic_travel.serializers.compiled_representation', wraps=serializers_module.compiled_representation,
+    )
+
+
+class CompiledSerializerParityTests(TestCase):
+    """The compiled read path must render byte for byte what DRF renders"""
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Forts & Palaces')
+        destinations = create_destinations(category, 3)
+        DestinationImage.objects.filter(destination=destinations[0]).update(
+            variants={'webp': {'640': 'destinations/derivatives/a_640.webp', '320': 'destinations/derivatives/a_320.webp'}},
+        )
+        qila = Destination.objects.create(
+            name='Shāhi Qila', description='Ünïcode "quoted"', category=category,
+            address='Walled City', city='Lahore', latitude=None, longitude=None,
+        )
+        # Names that need quoting or dot-segment handling take the full URL path
+        DestinationImage.objects.create(destination=qila, image='destinations/Shāhi qila (1).jpg')
+        DestinationImage.objects.create(
+            destination=qila, image='destinations/./gate.jpg', variants={'jpeg': {'320': 'destinations/../gate 320.jpg'}},
+        )
+        Destination.objects.filter(pk=destinations[1].pk).update(latitude='-0.1000005', longitude='179.9999994')
+
+    def assertParity(self, url, **params):
+        with override_settings(COMPILED_SERIALIZERS=False), compiled_calls() as stock:
+            expected = self.client.get(url, params)
+        with override_settings(COMPILED_SERIALIZERS=True), compiled_calls() as compiled:
+            actual = self.client.get(url, params)
+        self.assertEqual(expected.status_code, 200)
+        # Both bodies were rendered here, each through its own path
+        self.assertFalse(stock.called)
+        self.assertTrue(compiled.called)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_list_parity(self):
+        url = '/api/destinations/destinations/'
+        self.assertParity(url)
+        self.assertParity(url, pagination='cursor')
+        self.assertParity(url, fields='id,name,images.srcset')
+        self.assertParity(url, fields='name,latitude', expand='images')
+        self.assertParity(url + 'nearby/', lat='31.5', lon='74.3', radius_km='5')
+
+    def test_retrieve_parity(self):
+        for destination in Destination.objects.all():
+            with self.subTest(slug=destination.slug):
+                self.assertParity(f'/api/destinations/destinations/{destination.slug}/')
+
+    def test_parity_without_request(self):
+        destinations = list(Destination.objects.select_related('category').prefetch_related('images'))
+        # Unsaved values that still need quantizing and a naive timestamp
+        unsaved = Destination(
+            pk=0, name='Draft', category=destinations[0].category, latitude=Decimal('31.52036749'),
+            longitude=Decimal('74.3587'), created_at=datetime(2024, 1, 1, 12, 0),
+        )
+        unsaved._prefetched_objects_cache = {'images': DestinationImage.objects.none()}
+        destinations.append(unsaved)
+        with override_settings(COMPILED_SERIALIZERS=False):
+            expected = JSONRenderer().render(DestinationSerializer(destinations, many=True).data)
+        with compiled_calls() as compiled:
+            actual = JSONRenderer().render(DestinationSerializer(destinations, many=True).data)
+        self.assertTrue(compiled.called)
+        self.assertEqual(actual, expected)
+
+
+class RendererTests(TestCase):
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Shāhi Qila \u2028 "quoted"', 'decimal': Decimal('31.520367'), 'none': None,
+            'aware': datetime(2024, 1, 1, 12, 0, tzinfo=dt_timezone.utc), 'naive': datetime(2024, 1, 1, 12, 0, 0, 5000),
+            'nested': [{1: True, 'big': 2 ** 70}], 'float': 1.5,
+            'floats': [0.1, 1 / 3, -0.0, 0.0001, 123456789012345.6, 9999999999999998.0, 12.345],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4'),
+        )
+
+    def test_fast_renderer_floats_match_json_renderer(self):
+        # Exponent notation, including floats nested in lists and objects
+        for data in [[1e16, 1e-05, 5e-324, -2e-05, 1.7976931348623157e308], {'nested': [{'tiny': 1.5e-07}]}]:
+            with self.subTest(data=data):
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Strings and nulls that only look like such floats keep the orjson path
+        with mock.patch.object(JSONRenderer, 'render') as stock:
+            FastJSONRenderer().render({'code': '3e5', 'amount': '0.00001', 'none': None, 'float': 0.5})
+        self.assertEqual(stock.called, FastJSONRenderer.options == 0)
+
+        for value in (float('inf'), float('-inf'), float('nan')):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'distance_km': value})
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({'distance_km': value})
+
+    def test_streamed_list_matches_unpaginated_list(self):
+        category = Category.objects.create(name='camping')
+        create_destinations(category, 25)
+        response = self.client.get('/api/destinations/destinations/', {'format': 'json-stream'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        queryset = Destination.objects.select_related('category').prefetch_related('images').order_by('-created_at')
+        request = Request(APIRequestFactory().get('/api/destinations/destinations/'))
+        expected = JSONRenderer().render(DestinationSerializer(queryset, many=True, context={'request': request}).data)
+        self.assertEqual(b''.join(response.streaming_content), expected)
+
+
+@override_settings(GEOCODING={'MAX_ATTEMPTS': 2, 'RETRY_BACKOFF': 30, 'LEASE_SECONDS': 300, 'MIN_INTERVAL': 0})
+class GeocodeJobTests(TestCase):
+    def setUp(self):
+        self.destination = Destination.objects.create(
+            name='Fort', description='Somewhere', category=Category.objects.create(name='camping'),
+            address='Fort Road',
+        )
+        self.job = GeocodeJob.objects.get()
+        self.geocode = self.enterContext(mock.patch('destination.geocoding.geocode_address'))
+
+    def test_worker_writes_coordinates_back(self):
+        self.assertEqual((self.destination.geocode_status, self.job.address), ('pending', 'Fort Road'))
+        self.geocode.return_value = (31.588, 74.31)
+        out = StringIO()
+        call_command('geocode_worker', once=True, stdout=out)
+        self.assertIn('Geocoded 1, retrying 0, failed 0', out.getvalue())
+        self.geocode.assert_called_once_with('Fort Road')
+        self.destination.refresh_from_db()
+        self.assertEqual(
+            (self.destination.latitude, self.destination.longitude, self.destination.geocode_status),
+            (Decimal('31.588000'), Decimal('74.310000'), 'done'),
+        )
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts, self.job.locked_at), ('done', 1, None))
+
+    def test_leases_are_exclusive_until_they_go_stale(self):
+        later = Destination.objects.create(
+            name='Lake', description='Somewhere', category=self.destination.category, address='Lake Road',
+        )
+        GeocodeJob.objects.filter(destination=later).update(run_after=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual([job.pk for job in geocoding.claim_jobs(10)], [self.job.pk])
+        self.assertEqual(geocoding.claim_jobs(10), [])
+
+        # A worker that died mid-job leaves a lease that others take over
+        GeocodeJob.objects.filter(pk=self.job.pk).update(locked_at=timezone.now() - timedelta(seconds=301))
+        (job,) = geocoding.claim_jobs(10)
+        self.assertEqual((job.pk, job.status, job.attempts), (self.job.pk, 'running', 2))
+
+    def test_service_errors_back_off_then_fail(self):
+        self.geocode.side_effect = GeocoderServiceError('busy')
+        (job,) = geocoding.claim_jobs(10)
+        before = timezone.now()
+        with self.assertLogs('destination.geocoding', 'WARNING'):
+            self.assertEqual(geocoding.process_job(job), 'retry')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error, job.locked_at), ('pending', 'busy', None))
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=30))
+        self.assertEqual(geocoding.claim_jobs(10), [])
+
+        GeocodeJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        (job,) = geocoding.claim_jobs(10)
+        with self.assertLogs('destination.geocoding', 'WARNING'):
+            self.assertEqual(geocoding.process_job(job), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(Destination.objects.get().geocode_status, 'failed')
+
+    def test_unknown_addresses_fail_without_retrying(self):
+        self.geocode.return_value = (None, None)
+        (job,) = geocoding.claim_jobs(10)
+        self.assertEqual(geocoding.process_job(job), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('failed', 'Address not found'))
+        self.assertEqual(Destination.objects.get().geocode_status, 'failed')
+
+    def test_address_changed_while_queued(self):
+        self.geocode.return_value = (31.588, 74.31)
+        (job,) = geocoding.claim_jobs(10)
+        # Saving re-queues the job, so the stale lease can't record its result
+        self.destination.address = 'New Road'
+        self.destination.save()
+        self.assertEqual(geocoding.process_job(job), 'done')
+        requeued = GeocodeJob.objects.get()
+        self.assertEqual((requeued.status, requeued.address, requeued.attempts), ('pending', 'New Road', 0))
+        self.assertIsNone(Destination.objects.get().latitude)
+
+        # An edit that bypasses save() still keeps the old coordinates off the new address
+        (job,) = geocoding.claim_jobs(10)
+        Destination.objects.update(address='Third Road')
+        geocoding.process_job(job)
+        destination = Destination.objects.get()
+        self.assertEqual((destination.latitude, destination.geocode_status), (None, 'pending'))
+
+    @override_settings(GEOCODING={'MIN_INTERVAL': 60})
+    def test_throttle_waits_for_the_shared_slot(self):
+        geocoding.acquire_slot('test')
+        slot = GeocodeThrottle.objects.get(key='test').next_allowed_at
+        self.assertAlmostEqual((slot - timezone.now()).total_seconds(), 60, delta=5)
+
+        def another_worker_waits(seconds):
+            GeocodeThrottle.objects.filter(key='test').update(next_allowed_at=timezone.now())
+
+        with mock.patch('destination.geocoding.time.sleep', side_effect=another_worker_waits) as sleep:
+            geocoding.acquire_slot('test')
+        sleep.assert_called_once()
+        self.assertAlmostEqual(sleep.call_args.args[0], 60, delta=5)
+
+
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'gazetteer.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.write('address,latitude,longitude\n"Badshahi Mosque, Lahore",31.5881,74.3100\nFaisal Mosque,33.7295,73.0372\n')
+        self.enterContext(override_settings(GEOCODING={
+            'BACKENDS': ['destination.geocoding.GazetteerGeocoder'],
+            'GAZETTEER_PATH': path,
+            'CACHE_SIZE': 2,
+            'NEGATIVE_TTL': 3600,
+        }))
+        self.cache = geocoding.GeocodeCache()
+        backend = self.cache.backends[0]
+        self.backend = self.enterContext(mock.patch.object(backend, 'geocode', wraps=backend.geocode))
+
+    def test_gazetteer_matches_normalized_addresses(self):
+        gazetteer = geocoding.GazetteerGeocoder()
+        self.assertEqual(gazetteer.geocode('badshahi mosque  LAHORE'), (31.5881, 74.31))
+        self.assertIsNone(gazetteer.geocode('Minar-e-Pakistan'))
+        with override_settings(GEOCODING={}):
+            self.assertEqual(geocoding.GazetteerGeocoder().entries, {})
+
+    def test_hits_come_from_memory_then_the_database(self):
+        self.assertEqual(self.cache.lookup('Badshahi Mosque, Lahore'), (31.5881, 74.31))
+        entry = GeocodeCacheEntry.objects.get()
+        self.assertEqual((entry.address_key, entry.source, entry.expires_at), ('badshahi mosque lahore', 'gazetteer', None))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.lookup('BADSHAHI MOSQUE LAHORE'), (31.5881, 74.31))
+        # Another process: empty memory, shared table
+        other = geocoding.GeocodeCache()
+        with self.assertNumQueries(1):
+            self.assertEqual(other.lookup('badshahi mosque, lahore'), (31.5881, 74.31))
+        self.assertEqual(self.backend.call_count, 1)
+        self.assertEqual((self.cache.stats['memory_hits'], other.stats['db_hits']), (1, 1))
+
+    def test_misses_are_cached_until_the_negative_ttl(self):
+        self.assertEqual(self.cache.lookup('Nowhere'), (None, None))
+        entry = GeocodeCacheEntry.objects.get()
+        self.assertFalse(entry.found)
+        self.assertAlmostEqual((entry.expires_at - timezone.now()).total_seconds(), 3600, delta=5)
+
+        self.assertEqual(self.cache.lookup('nowhere'), (None, None))
+        self.assertEqual(geocoding.GeocodeCache().lookup('nowhere'), (None, None))
+        self.assertEqual(self.backend.call_count, 1)
+        self.assertEqual(self.cache.stats['negative_hits'], 1)
+
+        later = timezone.now() + timedelta(seconds=3601)
+        with mock.patch('destination.geocoding.timezone.now', return_value=later):
+            self.assertEqual(self.cache.lookup('nowhere'), (None, None))
+        self.assertEqual(self.backend.call_count, 2)
+        self.assertEqual(GeocodeCacheEntry.objects.count(), 1)
+
+    def test_backend_errors_are_not_cached(self):
+        self.backend.side_effect = GeocoderServiceError('busy')
+        with self.assertRaises(GeocoderServiceError):
+            self.cache.lookup('Faisal Mosque')
+        self.assertFalse(GeocodeCacheEntry.objects.exists())
+        self.backend.side_effect = None
+        self.assertEqual(self.cache.lookup('Faisal Mosque'), (33.7295, 73.0372))
+
+    def test_memory_is_bounded(self):
+        for address in ('Badshahi Mosque, Lahore', 'Faisal Mosque', 'Nowhere'):
+            self.cache.lookup(address)
+        self.assertEqual(len(self.cache.memory), 2)
+        self.assertIsNone(self.cache.memory.get('badshahi mosque lahore'))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * asin(sqrt(h))
+
+
+class NearbyTests(TestCase):
+    url = '/api/destinations/destinations/nearby/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='camping')
+
+    def place(self, name, lat, lon, category=None):
+        return Destination.objects.create(
+            name=name, description='Somewhere', category=category or self.category,
+            address=name, latitude=lat, longitude=lon,
+        )
+
+    def nearby(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['name'], row['distance_km']) for row in response.data]
+
+    def test_closest_first_within_the_radius(self):
+        self.place('Far', 31.6, 74.3)
+        self.place('Near', 31.51, 74.3)
+        self.place('Outside', 32.0, 74.3)
+        self.place('Centre', 31.5, 74.3, category=Category.objects.create(name='national_park'))
+
+        results = self.nearby(lat=31.5, lon=74.3, radius_km=20)
+        self.assertEqual([name for name, _ in results], ['Centre', 'Near', 'Far'])
+        self.assertEqual(results[0][1], 0)
+        self.assertAlmostEqual(results[2][1], haversine_km(31.5, 74.3, 31.6, 74.3), places=3)
+        self.assertEqual([name for name, _ in self.nearby(lat=31.5, lon=74.3, radius_km=20, limit=2)], ['Centre', 'Near'])
+        self.assertEqual(
+            [name for name, _ in self.nearby(lat=31.5, lon=74.3, radius_km=20, category='camping')], ['Near', 'Far']
+        )
+
+    def test_ranking_matches_a_full_scan(self):
+        # Grids around an ordinary point, the antimeridian and both poles
+        centres = [(31.5, 74.3), (0, 179.9), (10, -179.95), (89.9, 45), (-89.95, -120)]
+        for lat, lon in centres:
+            for dlat in (-0.5, -0.2, 0, 0.2, 0.5):
+                for dlon in (-0.9, -0.3, 0, 0.3, 0.9):
+                    cand_lat = max(-90, min(90, lat + dlat))
+                    cand_lon = (lon + dlon + 180) % 360 - 180
+                    self.place(f'Point {Destination.objects.count()}', round(cand_lat, 6), round(cand_lon, 6))
+
+        points = list(Destination.objects.values_list('id', 'latitude', 'longitude'))
+        for lat, lon in centres:
+            for radius_km in (15, 40, 80):
+                with self.subTest(lat=lat, lon=lon, radius_km=radius_km):
+                    expected = sorted(
+                        (distance, pk) for pk, distance in (
+                            (pk, haversine_km(lat, lon, float(cand_lat), float(cand_lon)))
+                            for pk, cand_lat, cand_lon in points
+                        ) if distance <= radius_km
+                    )
+                    ranked = geo.nearest(Destination.objects.all(), lat, lon, radius_km, 100)
+                    self.assertEqual([pk for _, pk in ranked], [pk for _, pk in expected])
+                    for (distance, _), (expected_distance, _) in zip(ranked, expected):
+                        self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_box_wraps_across_the_antimeridian(self):
+        east = self.place('East', 0, 179.95)
+        west = self.place('West', 0, -179.9)
+        self.place('Greenwich', 0, 0)
+        box = Destination.objects.filter(geo.bounding_box_filter(0, 179.99, 50))
+        self.assertEqual(set(box), {east, west})
+        self.assertEqual([name for name, _ in self.nearby(lat=0, lon=179.99, radius_km=50)], ['East', 'West'])
+
+    def test_box_covering_a_pole_spans_every_longitude(self):
+        self.place('Across the pole', 89.95, -170)
+        self.place('Same side', 89.8, 10)
+        results = self.nearby(lat=89.95, lon=10, radius_km=25)
+        self.assertEqual([name for name, _ in results], ['Across the pole', 'Same side'])
+        self.assertAlmostEqual(results[0][1], haversine_km(89.95, 10, 89.95, -170), places=3)
+
+    def test_parameter_validation(self):
+        self.place('Centre', 31.5, 74.3)
+        for params, error in [
+            ({'lon': 74.3}, 'lat and lon are required'),
+            ({'lat': 'north', 'lon': 74.3}, 'lat, lon, radius_km and limit must be numbers'),
+            ({'lat': 31.5, 'lon': 74.3, 'limit': '2.5'}, 'lat, lon, radius_km and limit must be numbers'),
+            ({'lat': 91, 'lon': 74.3}, 'lat/lon out of range'),
+            ({'lat': 31.5, 'lon': -180.5}, 'lat/lon out of range'),
+            ({'lat': 'nan', 'lon': 74.3}, 'lat/lon out of range'),
+            ({'lat': 31.5, 'lon': 74.3, 'radius_km': 0}, 'radius_km must be between 0 and 1000'),
+            ({'lat': 31.5, 'lon': 74.3, 'radius_km': 1001}, 'radius_km must be between 0 and 1000'),
+            ({'lat': 31.5, 'lon': 74.3, 'radius_km': 'inf'}, 'radius_km must be between 0 and 1000'),
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {'error': error})
+        # limit is clamped to 1..100 rather than rejected
+        self.assertEqual(len(self.nearby(lat=31.5, lon=74.3, limit=0)), 1)
+
+
+class BulkImageUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('editor', 'editor@example.com', 'pass'))
+        self.destination = create_destinations(Category.objects.create(name='camping'), 1, images_per_destination=0)[0]
+        self.url = f'/api/destinations/destinations/{self.destination.slug}/upload_images/'
+        self.cover = DestinationImage.objects.create(destination=self.destination, image='destinations/cover.png', is_primary=True)
+
+    def stored_files(self):
+        directory = os.path.join(self.media_root, 'destinations')
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if os.path.isfile(os.path.join(directory, name)))
+
+    def test_last_flagged_image_replaces_the_primary(self):
+        response = self.client.post(self.url, {
+            'images': [image_upload('a.png'), image_upload('b.png'), image_upload('c.png')],
+            'captions': ['First', 'Second'],
+            'is_primary': ['false', 'true', 'on'],
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([image['caption'] for image in response.data['images']], ['First', 'Second', ''])
+        self.assertEqual(len(self.stored_files()), 3)
+        primary = DestinationImage.objects.get(is_primary=True)
+        self.assertTrue(os.path.basename(primary.image.name).startswith('c'))
+        self.assertEqual(DestinationImage.objects.filter(destination=self.destination).count(), 4)
+
+    def test_unflagged_uploads_keep_the_primary(self):
+        response = self.client.post(self.url, {'images': [image_upload('a.png')]}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(DestinationImage.objects.get(is_primary=True), self.cover)
+
+    def test_invalid_files_are_rejected_before_anything_is_stored(self):
+        broken = SimpleUploadedFile('notes.png', b'not an image', content_type='image/png')
+        response = self.client.post(self.url, {'images': [image_upload('a.png'), broken]}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith('notes.png: '))
+        self.assertEqual(self.stored_files(), [])
+        self.assertEqual(DestinationImage.objects.count(), 1)
+
+    def test_failed_insert_rolls_back_and_removes_the_files(self):
+        with mock.patch.object(DestinationImage.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                DestinationImage.bulk_add(self.destination, [image_upload('a.png'), image_upload('b.png')], primary_index=0)
+        self.assertEqual(self.stored_files(), [])
+        self.assertEqual(list(DestinationImage.objects.all()), [self.cover])
+        self.assertTrue(DestinationImage.objects.get().is_primary)
+
+
+class AuditIndexesTests(TestCase):
+    def audit(self, **options):
+        out = StringIO()
+        call_command('audit_indexes', stdout=out, **options)
+        return out.getvalue()
+
+    def test_strict_passes_with_the_shipped_indexes(self):
+        out = self.audit(strict=True)
+        self.assertIn('ok         destinations: ?city=', out)
+        self.assertTrue(out.endswith('0 queries with full table scans\n'))
+
+    def test_strict_fails_on_a_full_scan(self):
+        queries = AuditIndexes().representative_queries() + [
+            ('destinations: ?description=', Destination.objects.filter(description='Somewhere'), False),
+        ]
+        self.enterContext(mock.patch.object(AuditIndexes, 'representative_queries', return_value=queries))
+        out = self.audit()
+        self.assertIn('FULL SCAN  destinations: ?description=', out)
+        self.assertTrue(out.endswith('1 queries with full table scans\n'))
+
+        with self.assertRaisesMessage(CommandError, 'Full table scans in: destinations: ?description=') as raised:
+            self.audit(strict=True)
+        self.assertEqual(raised.exception.returncode, 1)
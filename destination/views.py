@@ -1,38 +1,60 @@
+from django import forms
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
+from django.db.models import Value
+from django.db.models.functions import Lower
+from nomadic_travel.renderers import StreamingListMixin
+from nomadic_travel.serializers import is_expanded
 from .models import Category, Destination, DestinationImage
 from .serializers import CategorySerializer, DestinationSerializer, DestinationImageSerializer
+from .geo import nearest
+from .conditional import ConditionalGetMixin
+from .cache import CachedResponseMixin
+from . import search as destination_search
 
 # Create your views here.
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     permission_classes = [IsAuthenticated]
 
-class DestinationViewSet(viewsets.ModelViewSet):
+class DestinationViewSet(CachedResponseMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Destination.objects.all()
     serializer_class = DestinationSerializer
     lookup_field = 'slug'
+    # category_name is part of the payload; popularity_updated_at moves when ?ordering=popular reorders
+    validator_fields = ('updated_at', 'category__updated_at', 'popularity_updated_at')
+
+    def popular_first(self):
+        return self.request.query_params.get('ordering') == 'popular'
+
+    @property
+    def keyset_field(self):
+        # Keyset pages follow the popular-first order when it is asked for
+        return 'popularity' if self.popular_first() else 'created_at'
 
     def get_permissions(self):
         """
         Allow public access for viewing destinations
         Require authentication for creating, updating, and deleting
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'nearby']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        queryset = Destination.objects.all()
+        # Category and images are serialized for every row; load them up front
+        queryset = Destination.objects.select_related('category')
+        if is_expanded(self.request, 'images'):
+            queryset = queryset.prefetch_related('images')
         
         # Filter by category
         category = self.request.query_params.get('category', None)
@@ -42,24 +64,55 @@ class DestinationViewSet(viewsets.ModelViewSet):
         # Filter by city
         city = self.request.query_params.get('city', None)
         if city is not None:
-            queryset = queryset.filter(city__iexact=city)
+            # Same as city__iexact, but in a form that can use destination_city_lower_idx
+            queryset = queryset.alias(city_lower=Lower('city')).filter(city_lower=Lower(Value(city)))
         
-        # Filter by search term
+        # Filter by search term, best matches first
         search = self.request.query_params.get('search', None)
         if search is not None:
-            queryset = queryset.filter(
-                name__icontains=search
-            ) | queryset.filter(
-                description__icontains=search
-            ) | queryset.filter(
-                address__icontains=search
-            ) | queryset.filter(
-                city__icontains=search
-            )
-        
+            queryset = destination_search.search(queryset, search)
+            if not self.popular_first():
+                return queryset.order_by('search_rank', '-created_at')
+
+        # Most booked first, from the scores recompute_popularity keeps
+        if self.popular_first():
+            return queryset.order_by('-popularity', '-id')
+
         # Order by created_at by default
         return queryset.order_by('-created_at')
 
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Destinations within radius_km of lat/lon, closest first.
+        Combines with the category, city and search filters.
+        """
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius_km = float(request.query_params.get('radius_km', 10))
+            limit = int(request.query_params.get('limit', 20))
+        except KeyError:
+            return Response({'error': 'lat and lon are required'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'lat, lon, radius_km and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response({'error': 'lat/lon out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (0 < radius_km <= 1000):
+            return Response({'error': 'radius_km must be between 0 and 1000'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, 100))
+
+        ranked = nearest(self.get_queryset(), lat, lon, radius_km, limit)
+        destinations = self.get_queryset().in_bulk([pk for _, pk in ranked])
+
+        results = []
+        for distance, pk in ranked:
+            data = self.get_serializer(destinations[pk]).data
+            data['distance_km'] = round(distance, 3)
+            results.append(data)
+        return Response(results)
+
     @action(detail=True, methods=['post'])
     def upload_images(self, request, slug=None):
         destination = self.get_object()
@@ -67,22 +120,26 @@ class DestinationViewSet(viewsets.ModelViewSet):
         captions = request.data.getlist('captions', [])
         is_primary = request.data.getlist('is_primary', [])
 
-        for i, image in enumerate(images):
-            caption = captions[i] if i < len(captions) else ''
-            primary = is_primary[i] if i < len(is_primary) else False
-            
-            # If this image is marked as primary, unset any existing primary images
-            if primary:
-                DestinationImage.objects.filter(destination=destination, is_primary=True).update(is_primary=False)
-            
-            DestinationImage.objects.create(
-                destination=destination,
-                image=image,
-                caption=caption,
-                is_primary=primary
-            )
-
-        return Response({'status': 'images uploaded'}, status=status.HTTP_201_CREATED)
+        if not images:
+            return Response({'error': 'images is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        image_field = forms.ImageField()
+        for image in images:
+            try:
+                image_field.clean(image)
+            except forms.ValidationError as e:
+                return Response({'error': f"{image.name}: {e.messages[0]}"}, status=status.HTTP_400_BAD_REQUEST)
+            image.seek(0)
+
+        # Only one image can be primary; as before, the last one flagged wins
+        flagged = [i for i, value in enumerate(is_primary[:len(images)]) if str(value).lower() in ('true', '1', 'on')]
+        primary_index = flagged[-1] if flagged else None
+
+        # Resized copies are rendered by the generate_image_derivatives worker
+        created = DestinationImage.bulk_add(destination, images, captions, primary_index)
+
+        serializer = DestinationImageSerializer(created, many=True, context=self.get_serializer_context())
+        return Response({'status': 'images uploaded', 'images': serializer.data}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['delete'])
     def delete_image(self, request, slug=None):
@@ -0,0 +1,113 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over ``(keyset_field, id)``, both descending.
+
+    Each page is a single indexed range scan: no OFFSET and no COUNT(*). The
+    cursor is an opaque token encoding the boundary row's values, so pages stay
+    stable while rows are inserted.
+    """
+    cursor_query_param = 'cursor'
+
+    def __init__(self, field, page_size):
+        self.field = field
+        self.page_size = page_size
+
+    def encode_cursor(self, row, reverse):
+        value = getattr(row, self.field)
+        payload = {'v': value.isoformat() if hasattr(value, 'isoformat') else value, 'id': row.pk}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, queryset, token):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            # to_python raises ValidationError for values of the wrong type
+            value = queryset.model._meta.get_field(self.field).to_python(payload['v'])
+            if value is None:
+                raise ValueError('Cursor has no boundary value')
+            return value, int(payload['id']), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        token = request.query_params.get(self.cursor_query_param)
+        reverse = False
+
+        if token:
+            value, pk, reverse = self.decode_cursor(queryset, token)
+            if reverse:
+                boundary = Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'id__gt': pk})
+            else:
+                boundary = Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': pk})
+            queryset = queryset.filter(boundary)
+
+        if reverse:
+            queryset = queryset.order_by(self.field, 'id')
+        else:
+            queryset = queryset.order_by(f'-{self.field}', '-id')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, bool(token) and bool(rows)
+
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, PageNumberPagination.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(row, reverse))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.last, False) if self.has_next else None,
+            'previous': self.get_link(self.first, True) if self.has_previous else None,
+            'results': data,
+        })
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default. Views that declare ``keyset_field`` also
+    serve keyset pages when the request has ``?pagination=cursor`` or a
+    ``cursor`` from a previous keyset page. Keyset pages ignore any other
+    ordering, such as search rank.
+    """
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        field = getattr(view, 'keyset_field', None)
+        wants_cursor = (
+            request.query_params.get(self.mode_query_param) == 'cursor' or
+            KeysetPagination.cursor_query_param in request.query_params
+        )
+        if field and wants_cursor:
+            self.keyset = KeysetPagination(field, self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request)
+
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
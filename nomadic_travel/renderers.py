@@ -0,0 +1,163 @@
+import csv
+import itertools
+import math
+import re
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to DRF's json.dumps-based renderer
+    orjson = None
+
+
+# What orjson writes for floats it formats differently from json.dumps:
+# null for inf/nan, exponents without sign or padding, small values unrolled
+SUSPECT_FLOAT = re.compile(rb'null|\de|0\.0000')
+
+
+def _has_divergent_float(data):
+    """True if ``data`` holds a float that json.dumps writes differently or rejects"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            # Python switches to exponent notation outside [1e-4, 1e16)
+            if not math.isfinite(value) or (value and not 1e-4 <= abs(value) < 1e16):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def buffered(pieces, size=64 * 1024):
+    """Join small byte strings into chunks of about ``size`` for a streaming response"""
+    chunk = bytearray()
+    for piece in pieces:
+        chunk += piece
+        if len(chunk) >= size:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when it is installed.
+
+    Serializers already turn decimals and datetimes into strings, so normal
+    payloads encode natively. Anything orjson does not handle itself, including
+    raw datetimes, goes through DRF's encoder so the bytes match JSONRenderer.
+    Indented output (``Accept: application/json; indent=4``) and
+    non-compact settings also use the stock renderer.
+
+    orjson writes floats Python puts in exponent form (below 1e-4 or from 1e16
+    on) differently (``1e16``, ``0.00001`` where json writes ``1e+16``,
+    ``1e-05``) and writes ``null`` for inf and nan. When its output could hold
+    such a float, the data is checked and, if one is there, rendered by
+    JSONRenderer, which also raises for inf and nan.
+    """
+    options = 0 if orjson is None else (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type or '', renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return self.encode(data)
+
+    def encode(self, data):
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which json.dumps handles
+            return super().render(data)
+        if SUSPECT_FLOAT.search(ret) and _has_divergent_float(data):
+            return super().render(data)
+        # Same escaping as JSONRenderer: U+2028/U+2029 break JavaScript string literals
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """
+    Selected with ``?format=json-stream``. Views using ``StreamingListMixin``
+    write their whole, unpaginated list one row at a time, so memory stays flat
+    however many rows match. Other responses render like ``FastJSONRenderer``.
+    """
+    format = 'json-stream'
+    streaming = True
+    buffer_size = 64 * 1024
+
+    def render_stream(self, rows):
+        """Bytes of a JSON array of ``rows``, in chunks of about ``buffer_size``"""
+        def pieces():
+            yield b'['
+            separator = b''
+            for row in rows:
+                yield separator
+                yield self.render(row)
+                separator = b','
+            yield b']'
+        return buffered(pieces(), self.buffer_size)
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """One JSON object per line; ``render_stream`` is used by export views"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context) + b'\n'
+
+    def render_stream(self, rows, columns):
+        return buffered(self.render(dict(zip(columns, row))) for row in rows)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Non-streamed responses are errors such as {'detail': ...}: one header row, one value row
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+        return b''.join(self.render_stream(([row.get(name) for name in columns] for row in rows), columns))
+
+    def render_stream(self, rows, columns):
+        writer = csv.writer(_Echo())
+        lines = itertools.chain([columns], rows)
+        return buffered(writer.writerow(line).encode(self.charset) for line in lines)
+
+
+class StreamingListMixin:
+    """
+    Stream ``list`` responses when the negotiated renderer supports it.
+    Pagination is skipped and rows are read in chunks with ``iterator()``.
+    """
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not getattr(renderer, 'streaming', False):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(row) for row in queryset.iterator(chunk_size=self.stream_chunk_size))
+        return StreamingHttpResponse(renderer.render_stream(rows), content_type=renderer.media_type)
@@ -0,0 +1,256 @@
+import decimal
+import operator
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+from .media import media_url_builder
+
+
+def sparse_params(request):
+    """
+    ``(fields, expand)`` from ``?fields=`` and ``?expand=`` as sets of dotted
+    paths, or ``None`` when the request asks for the full representation.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None
+
+    def split(name):
+        return {path.strip() for value in params.getlist(name) for path in value.split(',') if path.strip()}
+    return split('fields'), split('expand')
+
+
+def is_expanded(request, path):
+    """Whether the nested relation at dotted ``path`` will be serialized"""
+    sparse = sparse_params(request)
+    if sparse is None:
+        return True
+    fields, expand = sparse
+    return any(
+        requested == path or requested.startswith(f'{path}.')
+        for requested in fields | expand
+    )
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=id,title`` limits output to the listed fields, and dotted names
+    reach into nested serializers (``?fields=destination_details.name``).
+    Relations named in ``expandable_fields`` are left out of sparse responses
+    unless requested through ``fields`` or ``?expand=``, which adds them to
+    the listed fields (``?fields=id,name&expand=images``). Without either
+    parameter the full representation is returned, as before.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = sparse_params(self.context.get('request'))
+        if sparse is None:
+            return fields
+
+        prefix = self.field_path()
+        requested, expand = (
+            {path[len(prefix):] for path in paths if path.startswith(prefix)}
+            for paths in sparse
+        )
+        # Only the part of each path that belongs to this level; expanded
+        # relations are added to the selected fields, as is_expanded assumes
+        selected = {path.split('.')[0] for path in requested}
+        expanded = {path.split('.')[0] for path in expand} | selected
+
+        for name in list(fields):
+            if (selected and name not in expanded) or (name in self.expandable_fields and name not in expanded):
+                fields.pop(name)
+        return fields
+
+    def field_path(self):
+        """Dotted prefix of this serializer inside the root, e.g. 'destination_details.'"""
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return ''.join(f'{name}.' for name in reversed(names))
+
+
+def _attribute_getter(field, model):
+    """
+    ``attrgetter`` for a source made only of model fields, or ``None`` when the
+    lookup needs DRF's general ``get_attribute`` (callables, dicts, nullable
+    relations and reverse one-to-ones, which DRF turns into ``None``)
+    """
+    attrs = field.source_attrs
+    if model is None or not attrs or type(field).get_attribute is not serializers.Field.get_attribute:
+        return None
+    for position, attr in enumerate(attrs):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if model_field.one_to_one and model_field.auto_created:
+            return None
+        if position < len(attrs) - 1:
+            if not model_field.concrete or not model_field.is_relation or model_field.null:
+                return None
+            model = model_field.related_model
+    return operator.attrgetter('.'.join(attrs))
+
+
+def _converter(field):
+    """The work ``field.to_representation`` does, resolved once per serializer"""
+    method = type(field).to_representation
+
+    if method is serializers.IntegerField.to_representation:
+        return int
+    if method is serializers.CharField.to_representation:
+        return str
+    if method is serializers.ReadOnlyField.to_representation:
+        return lambda value: value
+
+    if method is serializers.ChoiceField.to_representation:
+        choices = field.choice_strings_to_values
+        return lambda value: value if value == '' else choices.get(str(value), value)
+
+    if method is serializers.DecimalField.to_representation:
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce_to_string or field.localize or field.decimal_places is None:
+            return field.to_representation
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+
+        def convert(value):
+            if isinstance(value, decimal.Decimal):
+                return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+            return field.to_representation(value)
+        return convert
+
+    if method is serializers.DateTimeField.to_representation:
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if not isinstance(output_format, str) or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if getattr(value, 'tzinfo', None) is None:
+                return field.to_representation(value)
+            text = value.astimezone(field_timezone).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+
+    if method is serializers.FileField.to_representation:
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return field.to_representation
+        request = field.context.get('request')
+        builders = {}
+
+        def convert(value):
+            if not value:
+                return None
+            storage = value.storage
+            build = builders.get(storage)
+            if build is None:
+                build = builders[storage] = media_url_builder(storage, request)
+            try:
+                return build(value.name)
+            except AttributeError:
+                return None
+        return convert
+
+    if isinstance(field, serializers.ListSerializer) and method in LIST_REPRESENTATIONS:
+        child = compiled_representation(field.child)
+        return lambda value: [
+            child(item) for item in (value.all() if isinstance(value, models.Manager) else value)
+        ]
+    if isinstance(field, serializers.Serializer) and method in REPRESENTATIONS:
+        return compiled_representation(field)
+    return field.to_representation
+
+
+def _compile_field(field, model):
+    if isinstance(field, serializers.SerializerMethodField):
+        # source='*': the method receives the instance itself
+        return getattr(field.parent, field.method_name)
+
+    getter = _attribute_getter(field, model)
+    if getter is None:
+        def render(instance):
+            attribute = field.get_attribute(instance)
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            return None if check_for_none is None else field.to_representation(attribute)
+        return render
+
+    convert = _converter(field)
+
+    def render(instance):
+        value = getter(instance)
+        return None if value is None else convert(value)
+    return render
+
+
+def compiled_representation(serializer):
+    """
+    A function that renders one instance exactly like
+    ``serializer.to_representation``. Each field's attribute lookup and
+    conversion is resolved once per serializer instead of once per row, which
+    is where DRF spends most of its time on large lists. Serializers with a
+    custom ``to_representation`` are used as they are.
+    """
+    if type(serializer).to_representation not in REPRESENTATIONS:
+        return serializer.to_representation
+    compiled = serializer.__dict__.get('_compiled_representation')
+    if compiled is not None:
+        return compiled
+
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    steps = [(field.field_name, _compile_field(field, model)) for field in serializer._readable_fields]
+
+    def compiled(instance):
+        ret = {}
+        for name, render in steps:
+            try:
+                ret[name] = render(instance)
+            except SkipField:
+                pass
+        return ret
+
+    serializer._compiled_representation = compiled
+    return compiled
+
+
+class CompiledRepresentationMixin:
+    """
+    Serialize reads through ``compiled_representation``. The output is the
+    same as the stock DRF path; ``COMPILED_SERIALIZERS = False`` switches back
+    to it. Pair with ``list_serializer_class = CompiledListSerializer``.
+    """
+
+    def to_representation(self, instance):
+        if not getattr(settings, 'COMPILED_SERIALIZERS', True):
+            return super().to_representation(instance)
+        return compiled_representation(self)(instance)
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        if not getattr(settings, 'COMPILED_SERIALIZERS', True):
+            return super().to_representation(data)
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        render = compiled_representation(self.child)
+        return [render(item) for item in iterable]
+
+
+REPRESENTATIONS = (serializers.Serializer.to_representation, CompiledRepresentationMixin.to_representation)
+LIST_REPRESENTATIONS = (serializers.ListSerializer.to_representation, CompiledListSerializer.to_representation)
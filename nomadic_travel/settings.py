@@ -98,10 +98,49 @@ WSGI_APPLICATION = 'nomadic_travel.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            'timeout': 20,  # Seconds a writer waits for the lock before "database is locked"
+        },
+        # A file rather than shared-cache memory, so concurrency tests see real WAL locking
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Set on every new SQLite connection (nomadic_travel/db.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Safe with WAL; fsync at checkpoints rather than every commit
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Public destination responses. Shared between processes, so invalidations
+    # from workers and management commands reach every web worker; Redis works too.
+    'destinations': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DESTINATION_CACHE_DIR', BASE_DIR / 'cache' / 'destinations'),
+    },
+}
+
+# Runs the tests with the destination response cache off
+TEST_RUNNER = 'nomadic_travel.test_runner.TestRunner'
+
+DESTINATION_CACHE = {
+    'ALIAS': 'destinations',
+    'TIMEOUT': 300,  # Seconds a cached response is fresh; 0 disables
+    'STALE_GRACE': 60,  # Seconds a stale response may be served during a rebuild
+    'LOCK_TIMEOUT': 10,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -148,6 +187,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized copies of destination images (see destination/images.py)
+IMAGE_DERIVATIVES = {
+    'SIZES': [320, 640, 1280],  # Widths in pixels
+    'FORMATS': ['avif', 'webp', 'jpeg'],  # Formats Pillow can't encode are skipped
+    'QUALITY': 80,
+    'WORKERS': None,  # Process pool size; defaults to the number of CPUs
+}
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -156,10 +203,54 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson-backed JSON (falls back to json.dumps without orjson); ?format=json-stream
+    # streams unpaginated lists row by row (nomadic_travel/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'nomadic_travel.renderers.FastJSONRenderer',
+        'nomadic_travel.renderers.StreamingJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Page numbers by default; ?pagination=cursor opts into keyset pages
+    'DEFAULT_PAGINATION_CLASS': 'nomadic_travel.pagination.OptInKeysetPagination',
     'PAGE_SIZE': 10
 }
 
+# Render reads through precompiled field accessors (nomadic_travel/serializers.py);
+# False falls back to DRF's per-field path, which produces the same output
+COMPILED_SERIALIZERS = True
+
+
+# Geocoding settings (see destination/geocoding.py for defaults)
+GEOCODING = {
+    'USER_AGENT': 'nomadic_travel',
+    'MIN_INTERVAL': 1.0,  # Seconds between Nominatim requests across all workers
+    'MAX_ATTEMPTS': 5,
+    # Tried in order; add 'destination.geocoding.GazetteerGeocoder' with a
+    # GAZETTEER_PATH CSV (address,latitude,longitude) to answer lookups offline
+    'BACKENDS': ['destination.geocoding.NominatimGeocoder'],
+    'GAZETTEER_PATH': os.getenv('GEOCODING_GAZETTEER_PATH'),
+    'CACHE_SIZE': 1024,  # In-process LRU entries
+    'NEGATIVE_TTL': 7 * 24 * 60 * 60,  # Seconds before a failed address is retried
+}
+
+# Per-process DestinationRate cache used for pricing (see schedule/rates.py)
+RATE_CACHE = {
+    'TTL': 300,  # Seconds before other processes see a rate change; this one sees it at once
+    'MAX_SIZE': 10000,
+}
+
+# Rate changes queue a RepriceJob; run reprice_worker (see schedule/repricing.py)
+REPRICING = {
+    'MAX_ATTEMPTS': 5,  # Tries when the database is busy before a job is marked failed
+    'RETRY_BACKOFF': 30,  # Seconds, doubled on each retry
+}
+
+# ?ordering=popular scores (see destination/popularity.py); run recompute_popularity periodically
+POPULARITY = {
+    'HALF_LIFE_DAYS': 30,  # A booking counts half as much after this many days
+    'TOUR_WEIGHT': 1.0,
+    'PARTICIPANT_WEIGHT': 0.5,
+}
 
 # JWT settings
 SIMPLE_JWT = {
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite with the destination response cache off and in local
+    memory, so tests see what the views return rather than an earlier body.
+    Tests of the cache itself switch it back on with ``override_settings``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_settings = override_settings(
+            CACHES={
+                **settings.CACHES,
+                'destinations': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'destinations',
+                },
+            },
+            DESTINATION_CACHE={**settings.DESTINATION_CACHE, 'TIMEOUT': 0},
+        )
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -29,6 +29,8 @@ from accounts.views import (
     user_details,
     logout,
 )
+from destination.exports import DestinationExportView, DestinationImageExportView
+from schedule.exports import DestinationRateExportView, TourExportView
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -57,6 +59,11 @@ urlpatterns = [
     path('api/destinations/', include('destination.urls')),
 #schedule urls
     path('api/', include('schedule.urls')),
+#bulk exports (admin only, NDJSON or ?format=csv)
+    path('api/exports/destinations/', DestinationExportView.as_view(), name='export-destinations'),
+    path('api/exports/images/', DestinationImageExportView.as_view(), name='export-images'),
+    path('api/exports/rates/', DestinationRateExportView.as_view(), name='export-rates'),
+    path('api/exports/tours/', TourExportView.as_view(), name='export-tours'),
 #accounts urls
     path('api/auth/', include('rest_registration.api.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
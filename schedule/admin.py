@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Tour, DestinationRate
+from .models import DestinationMonthStats, DestinationRate, RepriceJob, Tour, UserTourStats
 
 @admin.register(DestinationRate)
 class DestinationRateAdmin(admin.ModelAdmin):
@@ -7,8 +7,34 @@ class DestinationRateAdmin(admin.ModelAdmin):
     search_fields = ('destination__name',)
     list_filter = ('destination',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # The save queued a RepriceJob (schedule.signals)
+        self.message_user(request, "Future tours for this destination are queued for repricing by reprice_worker.")
+
 @admin.register(Tour)
 class TourAdmin(admin.ModelAdmin):
-    list_display = ('title', 'destination', 'start_date', 'end_date', 'price', 'current_participants')
+    list_display = ('title', 'destination', 'start_date', 'end_date', 'price', 'current_participants', 'capacity')
+    readonly_fields = ('current_participants',)
     list_filter = ('destination', 'start_date')
     search_fields = ('title', 'description', 'destination')
+
+@admin.register(DestinationMonthStats)
+class DestinationMonthStatsAdmin(admin.ModelAdmin):
+    list_display = ('destination', 'month', 'tours', 'revenue', 'adults', 'children', 'kids', 'updated_at')
+    list_filter = ('month',)
+    search_fields = ('destination__name',)
+    readonly_fields = ('tours', 'revenue', 'adults', 'children', 'kids')
+
+@admin.register(UserTourStats)
+class UserTourStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'tours', 'revenue', 'adults', 'children', 'kids', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('tours', 'revenue', 'adults', 'children', 'kids')
+
+@admin.register(RepriceJob)
+class RepriceJobAdmin(admin.ModelAdmin):
+    list_display = ('destination', 'status', 'attempts', 'run_after', 'follow_up_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('destination__name',)
+    readonly_fields = ('locked_at', 'last_error', 'created_at', 'updated_at')
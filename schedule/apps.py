@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ScheduleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schedule'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from nomadic_travel.db import configure_sqlite
+
+        # Bookings write concurrently, which SQLite only handles well in WAL mode
+        connection_created.connect(configure_sqlite)
+        from . import signals  # noqa: F401
@@ -0,0 +1,106 @@
+import functools
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import Booking, Tour
+
+
+class BookingError(Exception):
+    status_code = 409
+
+
+class TourStarted(BookingError):
+    def __init__(self):
+        super().__init__('This tour has already started')
+
+
+class TourFull(BookingError):
+    def __init__(self):
+        super().__init__('Not enough seats left on this tour')
+
+
+class AlreadyBooked(BookingError):
+    def __init__(self):
+        super().__init__('You have already joined this tour')
+
+
+class NotBooked(BookingError):
+    status_code = 404
+
+    def __init__(self):
+        super().__init__('You have not joined this tour')
+
+
+def retry_when_locked(func, attempts=5):
+    """
+    Retry a whole transaction when SQLite reports the database as locked or
+    busy. That happens once the busy timeout runs out, or straight away when a
+    transaction's snapshot goes stale. Inside an outer transaction the error
+    is re-raised, since only the outermost block can be replayed.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if connection.in_atomic_block or attempt == attempts - 1 or 'locked' not in str(e):
+                    raise
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+    return wrapper
+
+
+def joinable_tours(user):
+    """Tours ``user`` may book: their own, and those their owners opened with ``bookable``"""
+    return Tour.objects.filter(Q(bookable=True) | Q(user=user))
+
+
+@retry_when_locked
+def join_tour(tour_id, user, seats=1):
+    """
+    Book ``seats`` on a tour for ``user``. The seat counter is claimed with a
+    single conditional UPDATE, so concurrent joins can never oversell or book
+    a tour that has started. The UPDATE also runs before any read, so SQLite
+    takes the write lock at the start instead of upgrading a stale read
+    snapshot. Tours the user may not book look like missing ones.
+    """
+    now = timezone.now()
+    tours = joinable_tours(user).filter(pk=tour_id)
+    with transaction.atomic():
+        claimed = tours.filter(start_date__gt=now).filter(
+            Q(capacity__isnull=True) | Q(current_participants__lte=F('capacity') - seats)
+        ).update(current_participants=F('current_participants') + seats, updated_at=now)
+        if not claimed:
+            start_date = tours.values_list('start_date', flat=True).first()
+            if start_date is None:
+                raise Tour.DoesNotExist
+            if start_date <= now:
+                raise TourStarted()
+            raise TourFull()
+        try:
+            # Raising rolls the seat claim back with the rest of the transaction
+            return Booking.objects.create(tour_id=tour_id, user=user, seats=seats)
+        except IntegrityError:
+            raise AlreadyBooked()
+
+
+@retry_when_locked
+def leave_tour(tour_id, user):
+    """Cancel ``user``'s booking and release its seats; returns the seats released"""
+    with transaction.atomic():
+        seats = Booking.objects.filter(tour_id=OuterRef('pk'), user=user).values('seats')[:1]
+        updated = Tour.objects.filter(pk=tour_id, bookings__user=user).update(
+            current_participants=F('current_participants') - Subquery(seats), updated_at=timezone.now()
+        )
+        if not updated:
+            if not joinable_tours(user).filter(pk=tour_id).exists():
+                raise Tour.DoesNotExist
+            raise NotBooked()
+        booking = Booking.objects.filter(tour_id=tour_id, user=user)
+        released = booking.values_list('seats', flat=True).first()
+        booking.delete()
+        return released
@@ -0,0 +1,27 @@
+from nomadic_travel.exports import ExportView
+from .models import DestinationRate, Tour
+
+
+class DestinationRateExportView(ExportView):
+    queryset = DestinationRate.objects.all()
+    columns = [
+        ('id', 'id'), ('destination_id', 'destination_id'), ('destination', 'destination__slug'),
+        ('adult_rate', 'adult_rate'), ('child_rate', 'child_rate'), ('kid_rate', 'kid_rate'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    filters = {'destination': 'destination__slug'}
+    filename = 'destination_rates'
+
+
+class TourExportView(ExportView):
+    queryset = Tour.objects.all()
+    columns = [
+        ('id', 'id'), ('user_id', 'user_id'), ('title', 'title'), ('description', 'description'),
+        ('destination_id', 'destination_id'), ('destination', 'destination__slug'),
+        ('start_date', 'start_date'), ('end_date', 'end_date'), ('price', 'price'),
+        ('current_participants', 'current_participants'),
+        ('adults', 'adults'), ('children', 'children'), ('kids', 'kids'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    filters = {'user': 'user_id', 'destination': 'destination__slug'}
+    filename = 'tours'
@@ -0,0 +1,100 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from destination.models import Category, Destination
+from schedule.models import DestinationRate, Tour
+from schedule.rates import rate_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time one-by-one POST /api/schedule/ against one POST /api/schedule/bulk/; nothing is kept'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tours', type=int, nargs='+', default=[50, 200])
+        parser.add_argument('--destinations', type=int, default=10, help='Distinct destinations the tours are spread over')
+
+    def setup(self, count):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name='other', custom_name=f'Bulk benchmark {tag}')
+        destinations = []
+        for i in range(count):
+            destination = Destination.objects.create(
+                name=f'Bulk benchmark {tag} {i}', description='Benchmark', category=category,
+                address='Benchmark', latitude=0, longitude=0,
+            )
+            DestinationRate.objects.create(destination=destination, adult_rate=100, child_rate=50, kid_rate=10)
+            destinations.append(destination)
+        user = get_user_model().objects.create_user(f'bulk-benchmark-{tag}', f'bulk-benchmark-{tag}@example.com')
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, destinations
+
+    def payload(self, count, destinations):
+        start = timezone.now() + timedelta(days=30)
+        return [
+            {
+                'title': f'Group tour {i}', 'description': 'Benchmark',
+                'destination': destinations[i % len(destinations)].name,
+                'start_date': (start + timedelta(days=i)).isoformat(),
+                'end_date': (start + timedelta(days=i + 2)).isoformat(),
+                'adults': 2, 'children': 1, 'kids': i % 3,
+            }
+            for i in range(count)
+        ]
+
+    def run(self, post):
+        # Rates are cold for both runs, as they are after a deploy
+        rate_cache.invalidate()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            post()
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries)
+
+    def handle(self, *args, **options):
+        for count in options['tours']:
+            try:
+                with transaction.atomic():
+                    client, destinations = self.setup(options['destinations'])
+                    tours = self.payload(count, destinations)
+
+                    def one_by_one():
+                        for tour in tours:
+                            if client.post('/api/schedule/', tour, format='json').status_code != 201:
+                                raise CommandError('Single create failed')
+
+                    def bulk():
+                        if client.post('/api/schedule/bulk/', {'tours': tours}, format='json').status_code != 201:
+                            raise CommandError('Bulk create failed')
+
+                    single, single_queries = self.run(one_by_one)
+                    batched, batched_queries = self.run(bulk)
+                    prices = Tour.objects.filter(destination__in=destinations).values_list('title', 'price')
+                    by_title = {}
+                    for title, price in prices:
+                        by_title.setdefault(title, set()).add(price)
+                    same = all(len(found) == 1 for found in by_title.values())
+
+                    self.stdout.write(
+                        f'{count:>5} tours  one-by-one {single * 1000 / count:6.2f} ms/tour ({single_queries} queries)  '
+                        f'bulk {batched * 1000 / count:6.2f} ms/tour ({batched_queries} queries)  '
+                        f'{single / batched:5.1f}x  {"same prices" if same else "PRICE MISMATCH"}'
+                    )
+                    raise Rollback
+            except Rollback:
+                pass
+            finally:
+                # Entries for the rolled-back destinations must not outlive them
+                rate_cache.invalidate()
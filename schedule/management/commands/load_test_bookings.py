@@ -0,0 +1,101 @@
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from destination.models import Category, Destination
+from schedule.bookings import BookingError, join_tour, leave_tour
+from schedule.models import Booking, Tour
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Hammer one tour with concurrent join/leave calls and check it never oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Concurrent threads, each with its own connection')
+        parser.add_argument('--users', type=int, default=400, help='Distinct users trying to book')
+        parser.add_argument('--capacity', type=int, default=250)
+        parser.add_argument('--leave-every', type=int, default=5, help='Every Nth successful booking is cancelled again (0 to never)')
+
+    def setup(self, options):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name='other', custom_name=f'Load test {tag}')
+        destination = Destination.objects.create(
+            name=f'Load test {tag}', description='Load test', category=category,
+            address='Load test', latitude=0, longitude=0,
+        )
+        start = timezone.now() + timedelta(days=30)
+        tour = Tour.objects.create(
+            title=f'Load test {tag}', description='Load test', destination=destination,
+            start_date=start, end_date=start + timedelta(days=1), capacity=options['capacity'], bookable=True,
+        )
+        users = User.objects.bulk_create([
+            User(username=f'loadtest-{tag}-{i}', email=f'loadtest-{tag}-{i}@example.com')
+            for i in range(options['users'])
+        ])
+        if any(user.pk is None for user in users):
+            users = list(User.objects.filter(username__startswith=f'loadtest-{tag}-'))
+        return category, tour, users
+
+    def handle(self, *args, **options):
+        category, tour, users = self.setup(options)
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def book(user, index):
+            try:
+                join_tour(tour.pk, user)
+                outcome = 'joined'
+                if options['leave_every'] and index % options['leave_every'] == 0:
+                    leave_tour(tour.pk, user)
+                    outcome = 'joined and left'
+            except BookingError as e:
+                outcome = type(e).__name__
+            finally:
+                # Worker threads open their own connections; don't leak them
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+
+        try:
+            journal_mode = connection.vendor
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = f'sqlite {cursor.fetchone()[0]}'
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['writers']) as pool:
+                list(pool.map(book, users, range(len(users))))
+            elapsed = time.perf_counter() - started
+
+            tour.refresh_from_db()
+            booked = Booking.objects.filter(tour=tour).aggregate(seats=Sum('seats'))['seats'] or 0
+            calls = outcomes['joined'] + 2 * outcomes['joined and left'] + outcomes['TourFull'] + outcomes['AlreadyBooked']
+            for outcome, count in sorted(outcomes.items()):
+                self.stdout.write(f'{outcome:<16} {count}')
+            self.stdout.write(
+                f'{calls} booking calls from {options["writers"]} writers in {elapsed:.2f}s '
+                f'({calls / elapsed:.0f}/sec, {journal_mode})'
+            )
+            self.stdout.write(f'current_participants={tour.current_participants} booked seats={booked} capacity={tour.capacity}')
+
+            if tour.current_participants != booked or booked > tour.capacity:
+                raise CommandError('Counter and bookings disagree or the tour is oversold')
+            if not options['leave_every'] and outcomes['TourFull'] and booked != tour.capacity:
+                raise CommandError('Bookings were refused while seats were still free')
+            self.stdout.write(self.style.SUCCESS('No overselling and no lost updates'))
+        finally:
+            # Cascades to the destination, tour and bookings
+            category.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the tour summary tables and destination tour counters from the Tour table, or check them with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Report rows that disagree with Tour instead of rebuilding')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['check']:
+            drift = stats.reconcile()
+            for (label, key), stored, actual in drift[:20]:
+                self.stderr.write(f'{label} {key}: stored {stored}, actual {actual}')
+            if drift:
+                raise CommandError(f'{len(drift)} summary rows disagree with Tour; run rebuild_tour_stats')
+            self.stdout.write(self.style.SUCCESS(f'Summary tables match Tour ({time.perf_counter() - started:.2f}s)'))
+            return
+
+        months, users = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {months} destination-month rows, {users} user rows and the destination counters in {time.perf_counter() - started:.2f}s'
+        ))
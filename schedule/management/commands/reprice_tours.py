@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from schedule.repricing import reprice_tours
+
+
+class Command(BaseCommand):
+    help = "Bring future tours' prices in line with the current destination rates in one UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destination', type=int, action='append', dest='destinations', help='Only this destination ID (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='List the price changes without writing them')
+
+    def handle(self, *args, **options):
+        repriced, elapsed, diff = reprice_tours(options['destinations'], dry_run=options['dry_run'])
+        for row in diff:
+            self.stdout.write(
+                f"tour {row['id']:<8} destination {row['destination_id']:<6} {row['start_date']:%Y-%m-%d}  "
+                f"{row['price']:>10} -> {row['new_price']:>10}  {row['title']}"
+            )
+        verb = 'Would reprice' if options['dry_run'] else 'Repriced'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {repriced} future tours in {elapsed * 1000:.1f} ms'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from schedule.repricing import claim_jobs, process_job
+
+
+class Command(BaseCommand):
+    help = 'Reprice future tours of destinations whose rates changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling')
+        parser.add_argument('--batch-size', type=int, default=10, help='Number of jobs to lease at a time')
+        parser.add_argument('--idle-sleep', type=float, default=5.0, help='Seconds to wait when no job is due')
+
+    def handle(self, *args, **options):
+        totals = {'done': 0, 'follow-up': 0, 'retry': 0, 'failed': 0}
+        tours = 0
+
+        try:
+            while True:
+                jobs = claim_jobs(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['idle_sleep'])
+                    continue
+
+                for job in jobs:
+                    outcome, repriced = process_job(job)
+                    totals[outcome] += 1
+                    tours += repriced
+                    self.stdout.write(f"Destination {job.destination_id}: {outcome}, {repriced} tours repriced")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Repriced {tours} tours: {totals['done']} jobs done, {totals['follow-up']} awaiting a follow-up pass, "
+            f"retrying {totals['retry']}, failed {totals['failed']}"
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0011_keyset_indexes'),
+        ('schedule', '0005_tour_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tour',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tours', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['user', '-start_date', '-id'], name='tour_user_start_id_idx'),
+        ),
+    ]
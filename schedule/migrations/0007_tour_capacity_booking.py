@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-17 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0014_query_indexes'),
+        ('schedule', '0006_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tour',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Seats available for booking; empty means unlimited', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='tour',
+            constraint=models.CheckConstraint(check=models.Q(('capacity__isnull', True), ('current_participants__lte', models.F('capacity')), _connector='OR'), name='tour_within_capacity'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='tour',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='schedule.tour'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('tour', 'user'), name='booking_tour_user_unique'),
+        ),
+    ]
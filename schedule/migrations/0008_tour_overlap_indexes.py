@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0014_query_indexes'),
+        ('schedule', '0007_tour_capacity_booking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['user', 'end_date', 'start_date'], name='tour_user_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['end_date', 'start_date'], name='tour_end_start_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_stats(apps, schema_editor):
+    Tour = apps.get_model('schedule', 'Tour')
+    DestinationMonthStats = apps.get_model('schedule', 'DestinationMonthStats')
+    UserTourStats = apps.get_model('schedule', 'UserTourStats')
+    totals = dict(tours=Count('id'), revenue=Sum('price'), adults=Sum('adults'), children=Sum('children'), kids=Sum('kids'))
+
+    months = Tour.objects.annotate(month=TruncMonth('start_date', output_field=DateField())).order_by()
+    DestinationMonthStats.objects.bulk_create(
+        DestinationMonthStats(destination_id=row.pop('destination'), **row)
+        for row in months.values('destination', 'month').annotate(**totals)
+    )
+    UserTourStats.objects.bulk_create(
+        UserTourStats(user_id=row.pop('user'), **row)
+        for row in Tour.objects.filter(user__isnull=False).order_by().values('user').annotate(**totals)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0015_destination_name_key'),
+        ('schedule', '0008_tour_overlap_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTourStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tours', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('adults', models.PositiveIntegerField(default=0)),
+                ('children', models.PositiveIntegerField(default=0)),
+                ('kids', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tour_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User tour stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='DestinationMonthStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tours', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('adults', models.PositiveIntegerField(default=0)),
+                ('children', models.PositiveIntegerField(default=0)),
+                ('kids', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField()),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_stats', to='destination.destination')),
+            ],
+            options={
+                'verbose_name_plural': 'Destination month stats',
+                'ordering': ['month', 'destination'],
+                'indexes': [models.Index(fields=['month'], name='destination_month_stats_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='destinationmonthstats',
+            constraint=models.UniqueConstraint(fields=('destination', 'month'), name='destination_month_stats_unique'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:10
+
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_tours(apps, schema_editor):
+    Tour = apps.get_model('schedule', 'Tour')
+    Destination = apps.get_model('destination', 'Destination')
+    tours = Tour.objects.filter(destination=OuterRef('pk')).order_by().values('destination')
+    Destination.objects.update(
+        tour_count=Coalesce(Subquery(tours.annotate(total=Count('id')).values('total')), 0),
+        participant_count=Coalesce(
+            Subquery(tours.annotate(total=Sum(F('adults') + F('children') + F('kids'))).values('total')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destination', '0016_destination_popularity'),
+        ('schedule', '0009_tour_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_tours, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-17 11:33
+
+from django.db import migrations, models
+
+
+def open_booked_tours(apps, schema_editor):
+    # Tours others have already joined stay open to them
+    Tour = apps.get_model('schedule', 'Tour')
+    Booking = apps.get_model('schedule', 'Booking')
+    Tour.objects.filter(pk__in=Booking.objects.values('tour_id')).update(bookable=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0011_repricejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='bookable',
+            field=models.BooleanField(default=False, help_text='Let other users join this tour; the owner always can'),
+        ),
+        migrations.RunPython(open_booked_tours, migrations.RunPython.noop),
+    ]
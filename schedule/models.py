@@ -1,7 +1,11 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.utils import timezone
 from destination.models import Destination
 from django.contrib.auth import get_user_model
+from .pricing import tour_price
+from .rates import rate_cache, rate_cache_setting
 
 User = get_user_model()
 
@@ -24,7 +28,10 @@ class Tour(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    # Seats taken by bookings; only changed through schedule.bookings
     current_participants = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Seats available for booking; empty means unlimited")
+    bookable = models.BooleanField(default=False, help_text="Let other users join this tour; the owner always can")
     adults = models.PositiveIntegerField(default=0)
     children = models.PositiveIntegerField(default=0)
     kids = models.PositiveIntegerField(default=0)
@@ -32,23 +39,157 @@ class Tour(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def calculate_price(self):
-        try:
-            rates = self.destination.rates
-            total_price = (
-                self.adults * rates.adult_rate +
-                self.children * rates.child_rate +
-                self.kids * rates.kid_rate
-            )
-            return total_price
-        except DestinationRate.DoesNotExist:
+        rates = rate_cache.get(self.destination_id)
+        if rates is None:
             return 0
+        return tour_price(rates, self.adults, self.children, self.kids)
 
     def save(self, *args, **kwargs):
         self.price = self.calculate_price()
-        super().save(*args, **kwargs)
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # current_participants is maintained by schedule.bookings; writing back
+            # the copy loaded with this instance would undo concurrent bookings
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'current_participants'
+            ]
+        # The signals in schedule.signals update the stats tables; keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            # TourViewSet lists a user's tours newest first, paged by (start_date, id)
+            models.Index(fields=['user', '-start_date', '-id'], name='tour_user_start_id_idx'),
+            # Date-window overlap (start_date < to AND end_date > from): seek on end_date,
+            # check start_date from the index without touching the table
+            models.Index(fields=['user', 'end_date', 'start_date'], name='tour_user_end_start_idx'),
+            models.Index(fields=['end_date', 'start_date'], name='tour_end_start_idx'),
+        ]
+        constraints = [
+            # Last line of defence behind the conditional UPDATE in schedule.bookings
+            models.CheckConstraint(
+                check=models.Q(capacity__isnull=True) | models.Q(current_participants__lte=models.F('capacity')),
+                name='tour_within_capacity',
+            ),
+        ]
+
+
+class Booking(models.Model):
+    tour = models.ForeignKey(Tour, on_delete=models.CASCADE, related_name='bookings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
+    seats = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} on {self.tour} ({self.seats})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tour', 'user'], name='booking_tour_user_unique'),
+        ]
+
+
+class StatsFields(models.Model):
+    """Running totals over a set of tours, kept up to date by schedule.stats"""
+    tours = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    adults = models.PositiveIntegerField(default=0)
+    children = models.PositiveIntegerField(default=0)
+    kids = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def participants(self):
+        return self.adults + self.children + self.kids
+
+    class Meta:
+        abstract = True
+
+
+class DestinationMonthStats(StatsFields):
+    destination = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='month_stats')
+    # First day of the month the tours start in, in the project timezone
+    month = models.DateField()
+
+    def __str__(self):
+        return f"{self.destination} {self.month:%Y-%m}"
+
+    class Meta:
+        ordering = ['month', 'destination']
+        verbose_name_plural = "Destination month stats"
+        constraints = [
+            models.UniqueConstraint(fields=['destination', 'month'], name='destination_month_stats_unique'),
+        ]
+        indexes = [
+            # All destinations for one month
+            models.Index(fields=['month'], name='destination_month_stats_idx'),
+        ]
+
+
+class UserTourStats(StatsFields):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tour_stats')
+
+    def __str__(self):
+        return f"Tour stats for {self.user}"
+
+    class Meta:
+        verbose_name_plural = "User tour stats"
+
+
+class RepriceJob(models.Model):
+    """
+    A destination whose rates changed, waiting for the reprice_worker command
+    to bring its future tours in line (see schedule.repricing)
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    # Seconds past the rate cache TTL before the follow-up pass, for requests
+    # that priced a tour at the old rates and are still saving it
+    FOLLOW_UP_MARGIN = 60
+
+    destination = models.OneToOneField(Destination, on_delete=models.CASCADE, related_name='reprice_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Other processes price new tours from cached rates until their entries expire;
+    # a second pass at this time catches the tours they saved at the old rates
+    follow_up_at = models.DateTimeField(null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def enqueue(cls, destination_id):
+        """(Re)queue a destination: one pass now and a follow-up once every rate cache has expired"""
+        now = timezone.now()
+        job, _ = cls.objects.update_or_create(
+            destination_id=destination_id,
+            defaults={
+                'status': 'pending',
+                'attempts': 0,
+                'run_after': now,
+                'follow_up_at': now + timedelta(seconds=rate_cache_setting('TTL') + cls.FOLLOW_UP_MARGIN),
+                'locked_at': None,
+                'last_error': '',
+            }
+        )
+        return job
+
+    def __str__(self):
+        return f"Reprice destination {self.destination_id} ({self.status})"
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='repricejob_status_run_idx'),
+        ]
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from destination.models import Destination
+from destination.resolver import DestinationResolver, is_id
+from .rates import rate_cache
+
+CENTS = Decimal('0.01')
+PARTY_FIELDS = ('adults', 'children', 'kids')
+
+
+def tour_price(rates, adults, children, kids):
+    """Price of a party at ``rates`` = (adult_rate, child_rate, kid_rate)"""
+    adult_rate, child_rate, kid_rate = rates
+    return adults * adult_rate + children * child_rate + kids * kid_rate
+
+
+def load_rates(destinations, resolver):
+    """
+    ``{reference: (destination_id, rates or None)}`` for destination ids and
+    names. Ids are served from the rate cache. Names are resolved on
+    ``name_key`` in one query, then their rates also come from the cache.
+    Unknown and ambiguous references are left out.
+    """
+    ids = [ref for ref in destinations if is_id(ref)]
+    names = [ref for ref in destinations if isinstance(ref, str)]
+    resolver.prime(names)
+    by_name = {}
+    for name in names:
+        try:
+            destination = resolver.resolve(name)
+        except Destination.MultipleObjectsReturned:
+            continue
+        if destination is not None:
+            by_name[name] = destination.id
+
+    rates = rate_cache.get_many(ids + list(by_name.values()))
+    found = {ref: (ref, rates[ref]) for ref in ids if ref in rates}
+    found.update((name, (destination_id, rates.get(destination_id))) for name, destination_id in by_name.items())
+    return found
+
+
+def missing_destination_error(reference, resolver):
+    try:
+        if isinstance(reference, str):
+            resolver.resolve(reference)
+    except Destination.MultipleObjectsReturned as e:
+        return str(e)
+    return 'Destination not found'
+
+
+def quote(items, resolver=None):
+    """
+    Prices for ``items``, each a dict with ``destination`` (id or name) and
+    party counts. Rates are loaded once for the whole batch, then every price
+    is computed in a single pass over the parties.
+    """
+    resolver = DestinationResolver() if resolver is None else resolver
+    rates = load_rates({item['destination'] for item in items}, resolver)
+    results = []
+    for item in items:
+        destination_id, destination_rates = rates.get(item['destination'], (None, None))
+        result = {'destination': item['destination'], 'destination_id': destination_id}
+        result.update((field, item[field]) for field in PARTY_FIELDS)
+        if destination_id is None:
+            result.update(price=None, error=missing_destination_error(item['destination'], resolver))
+        elif destination_rates is None:
+            result.update(price=None, error='Rates not set for this destination')
+        else:
+            price = tour_price(destination_rates, *(item[field] for field in PARTY_FIELDS))
+            result['price'] = '{:f}'.format(price.quantize(CENTS))
+        results.append(result)
+    return results
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from django.conf import settings
+
+from destination.geocoding import LRUCache
+from destination.models import Destination
+
+DEFAULTS = {
+    'TTL': 300,  # Seconds an entry is trusted; other processes only see rate edits after this
+    'MAX_SIZE': 10000,
+}
+
+
+def rate_cache_setting(name):
+    return getattr(settings, 'RATE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class RateCache:
+    """
+    Process-local ``destination_id -> (adult_rate, child_rate, kid_rate)``,
+    or ``None`` for a destination without rates.
+
+    Saving or deleting a DestinationRate drops its entry in this process,
+    at once and again on commit (see schedule/signals.py). Other processes
+    pick the change up when the TTL runs out.
+    """
+
+    def __init__(self):
+        self.entries = LRUCache(rate_cache_setting('MAX_SIZE'))
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def get_many(self, destination_ids):
+        """Rates for existing destinations among ``destination_ids``, querying only the misses"""
+        now = time.monotonic()
+        found, missing = {}, []
+        for destination_id in set(destination_ids):
+            entry = self.entries.get(destination_id)
+            if entry is not None and entry[0] > now:
+                found[destination_id] = entry[1]
+            else:
+                missing.append(destination_id)
+        self._count('hits', len(found))
+        if missing:
+            self._count('misses', len(missing))
+            rows = Destination.objects.filter(id__in=missing).values_list(
+                'id', 'rates__adult_rate', 'rates__child_rate', 'rates__kid_rate'
+            )
+            loaded = {destination_id: tuple(rates) if rates[0] is not None else None for destination_id, *rates in rows}
+            self.update(loaded)
+            found.update(loaded)
+        return found
+
+    def get(self, destination_id):
+        return self.get_many([destination_id]).get(destination_id)
+
+    def update(self, rates):
+        expires = time.monotonic() + rate_cache_setting('TTL')
+        for destination_id, destination_rates in rates.items():
+            self.entries.set(destination_id, (expires, destination_rates))
+
+    def invalidate(self, destination_id=None):
+        self._count('invalidations')
+        if destination_id is None:
+            self.entries.clear()
+        else:
+            self.entries.delete(destination_id)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats.update(size=len(self.entries), hit_rate=round(stats['hits'] / lookups, 4) if lookups else None)
+        return stats
+
+
+rate_cache = RateCache()
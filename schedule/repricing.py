@@ -0,0 +1,129 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import DateField, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Round, TruncMonth
+from django.utils import timezone
+
+from . import stats
+from .pricing import CENTS
+from .models import DestinationRate, RepriceJob, Tour
+
+logger = logging.getLogger(__name__)
+
+PRICE = DecimalField(max_digits=10, decimal_places=2)
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'LEASE_SECONDS': 300,
+}
+
+
+def repricing_setting(name):
+    return getattr(settings, 'REPRICING', {}).get(name, DEFAULTS[name])
+
+
+def current_price():
+    """A tour's price at its destination's current rates, as one correlated subquery"""
+    total = (
+        OuterRef('adults') * F('adult_rate') + OuterRef('children') * F('child_rate') + OuterRef('kids') * F('kid_rate')
+    )
+    rates = DestinationRate.objects.filter(destination=OuterRef('destination_id')).annotate(
+        total=Round(ExpressionWrapper(total, output_field=PRICE), 2)
+    ).values('total')[:1]
+    return Subquery(rates, output_field=PRICE)
+
+
+def stale_tours(destination_ids=None, now=None):
+    """Tours that haven't started yet and whose price differs from their destination's current rates"""
+    tours = Tour.objects.filter(start_date__gt=now or timezone.now(), destination__rates__isnull=False)
+    if destination_ids is not None:
+        tours = tours.filter(destination_id__in=destination_ids)
+    return tours.annotate(new_price=current_price()).exclude(price=F('new_price'))
+
+
+def reprice_tours(destination_ids=None, dry_run=False, now=None):
+    """
+    Bring future tours of ``destination_ids`` (default: all) in line with
+    the current rates using one UPDATE. The revenue totals in the summary
+    tables move by the same amounts, grouped per row in one query.
+
+    Returns ``(tours repriced, seconds taken, diff)``. ``diff`` is only
+    filled for a dry run, which changes nothing.
+    """
+    started = time.perf_counter()
+    now = now or timezone.now()
+    stale = stale_tours(destination_ids, now)
+
+    if dry_run:
+        diff = list(stale.order_by('start_date', 'id').values(
+            'id', 'title', 'destination_id', 'start_date', 'price', 'new_price'
+        ))
+        for row in diff:
+            # SQLite hands computed decimals back unrounded
+            row['new_price'] = row['new_price'].quantize(CENTS)
+        return len(diff), time.perf_counter() - started, diff
+
+    with transaction.atomic():
+        # UPDATE skips the Tour signals, so work out what they would have recorded first
+        changes = stale.annotate(month=TruncMonth('start_date', output_field=DateField())).order_by().values(
+            'destination_id', 'month', 'user_id'
+        ).annotate(delta=Sum(F('new_price') - F('price'), output_field=PRICE))
+        stats.adjust_revenue({**change, 'delta': change['delta'].quantize(CENTS)} for change in changes)
+        repriced = Tour.objects.filter(pk__in=stale.values('pk')).update(price=current_price(), updated_at=now)
+    return repriced, time.perf_counter() - started, []
+
+
+def claim_jobs(limit):
+    """Lease up to ``limit`` runnable jobs, including ones abandoned by a dead worker"""
+    now = timezone.now()
+    runnable = (
+        Q(status='pending', run_after__lte=now) |
+        Q(status='running', locked_at__lt=now - timedelta(seconds=repricing_setting('LEASE_SECONDS')))
+    )
+    candidates = list(RepriceJob.objects.filter(runnable).values_list('id', flat=True)[:limit])
+
+    claimed = []
+    for job_id in candidates:
+        # Another worker may have taken the job since we read it
+        if RepriceJob.objects.filter(runnable, pk=job_id).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1
+        ):
+            claimed.append(job_id)
+    return list(RepriceJob.objects.filter(id__in=claimed))
+
+
+def _finish(job, **fields):
+    """Record the outcome unless the rates changed again and re-queued the job meanwhile"""
+    return RepriceJob.objects.filter(pk=job.pk, status='running', locked_at=job.locked_at).update(**fields)
+
+
+def process_job(job):
+    """
+    Reprice one leased job's destination. The first pass is followed by a
+    second one at ``follow_up_at``; returns ``(outcome, tours repriced)``.
+    """
+    try:
+        repriced, elapsed, _ = reprice_tours([job.destination_id])
+    except DatabaseError as e:
+        logger.warning(f"Repricing error for job {job.pk}: {e}")
+        if job.attempts >= repricing_setting('MAX_ATTEMPTS'):
+            _finish(job, status='failed', last_error=str(e), locked_at=None)
+            return 'failed', 0
+        backoff = repricing_setting('RETRY_BACKOFF') * 2 ** (job.attempts - 1)
+        _finish(
+            job, status='pending', last_error=str(e), locked_at=None,
+            run_after=timezone.now() + timedelta(seconds=backoff)
+        )
+        return 'retry', 0
+
+    logger.info(f"Repriced {repriced} tours of destination {job.destination_id} in {elapsed:.3f}s")
+    if job.follow_up_at and job.follow_up_at > timezone.now():
+        _finish(job, status='pending', attempts=0, last_error='', locked_at=None, run_after=job.follow_up_at)
+        return 'follow-up', repriced
+    _finish(job, status='done', last_error='', locked_at=None)
+    return 'done', repriced
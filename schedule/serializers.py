@@ -1,7 +1,10 @@
 from rest_framework import serializers
-from .models import Tour, DestinationRate
+from .models import DestinationMonthStats, DestinationRate, Tour, UserTourStats
+from .rates import rate_cache
 from destination.serializers import DestinationSerializer
+from nomadic_travel.serializers import CompiledListSerializer, CompiledRepresentationMixin, SparseFieldsMixin
 from destination.models import Destination
+from destination.resolver import context_resolver, is_id
 from django.utils import timezone
 
 class DestinationRateSerializer(serializers.ModelSerializer):
@@ -13,24 +16,35 @@ class DestinationRateSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 class DestinationField(serializers.Field):
+    def get_attribute(self, instance):
+        # Only the id is rendered, so don't load the related row
+        return instance.destination_id
+
     def to_representation(self, value):
-        return value.id
+        return value
 
     def to_internal_value(self, data):
-        if isinstance(data, int):
-            try:
-                return Destination.objects.get(id=data)
-            except Destination.DoesNotExist:
-                raise serializers.ValidationError(f"Destination with ID {data} not found")
-        elif isinstance(data, str):
-            try:
-                return Destination.objects.get(name__iexact=data)
-            except Destination.DoesNotExist:
-                raise serializers.ValidationError(f"Destination '{data}' not found")
-        else:
+        if not is_id(data) and not isinstance(data, str):
             raise serializers.ValidationError("Destination must be either an ID (integer) or name (string)")
+        # One resolver per request, so a batch of tours looks its destinations up together
+        try:
+            destination = context_resolver(self.context).resolve(data)
+        except Destination.MultipleObjectsReturned as e:
+            raise serializers.ValidationError(str(e))
+        if destination is None:
+            if isinstance(data, int):
+                raise serializers.ValidationError(f"Destination with ID {data} not found")
+            raise serializers.ValidationError(f"Destination '{data}' not found")
+        return destination
+
+class TourListSerializer(CompiledListSerializer):
+    def to_internal_value(self, data):
+        # Look every destination in the list up with one query before the items are validated
+        if isinstance(data, list):
+            context_resolver(self.context).prime(item.get('destination') for item in data if isinstance(item, dict))
+        return super().to_internal_value(data)
 
-class TourSerializer(serializers.ModelSerializer):
+class TourSerializer(CompiledRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
     destination_details = DestinationSerializer(source='destination', read_only=True)
     destination = DestinationField()
     price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -43,10 +57,12 @@ class TourSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'destination', 'destination_details',
             'start_date', 'end_date', 'price', 'total_participants',
-            'adults', 'children', 'kids',
+            'adults', 'children', 'kids', 'capacity', 'bookable', 'current_participants',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['price', 'total_participants']
+        read_only_fields = ['price', 'total_participants', 'current_participants']
+        list_serializer_class = TourListSerializer
+    expandable_fields = ['destination_details']
 
     def get_total_participants(self, obj):
         return obj.adults + obj.children + obj.kids
@@ -69,11 +85,18 @@ class TourSerializer(serializers.ModelSerializer):
 
         # Validate destination has rates
         destination = data.get('destination')
-        if destination and not hasattr(destination, 'rates'):
+        if destination and rate_cache.get(destination.id) is None:
             raise serializers.ValidationError({
                 "destination": f"Rates not set for destination '{destination.name}'. Please contact administrator."
             })
 
+        # Seats already booked can't be taken away
+        capacity = data.get('capacity')
+        if self.instance is not None and capacity is not None and capacity < self.instance.current_participants:
+            raise serializers.ValidationError({
+                "capacity": f"Capacity cannot be lower than the {self.instance.current_participants} seats already booked"
+            })
+
         # Ensure children and kids are not negative
         if data.get('children', 0) < 0:
             raise serializers.ValidationError({
@@ -100,4 +123,30 @@ class TourSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user:
             validated_data['user'] = request.user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class TourCalendarSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    """Just enough of a tour to place it on a calendar"""
+
+    class Meta:
+        model = Tour
+        fields = ['id', 'title', 'start_date', 'end_date']
+        read_only_fields = fields
+        list_serializer_class = CompiledListSerializer
+
+class DestinationMonthStatsSerializer(serializers.ModelSerializer):
+    month = serializers.DateField(format='%Y-%m')
+    participants = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = DestinationMonthStats
+        fields = ['destination', 'month', 'tours', 'revenue', 'adults', 'children', 'kids', 'participants', 'updated_at']
+        read_only_fields = fields
+
+class UserTourStatsSerializer(serializers.ModelSerializer):
+    participants = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = UserTourStats
+        fields = ['user', 'tours', 'revenue', 'adults', 'children', 'kids', 'participants', 'updated_at']
+        read_only_fields = fields
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from destination.models import Destination
+from . import stats
+from .models import DestinationRate, RepriceJob, Tour
+from .rates import rate_cache
+
+
+def forget_rates(destination_id):
+    """
+    Drop a destination's cached rates now, so the rest of this transaction
+    sees the change, and again on commit: until then other requests in this
+    process still read, and may re-cache, the old rates.
+    """
+    rate_cache.invalidate(destination_id)
+    transaction.on_commit(lambda: rate_cache.invalidate(destination_id))
+
+
+@receiver([post_save, post_delete], sender=DestinationRate)
+def invalidate_cached_rates(sender, instance, **kwargs):
+    forget_rates(instance.destination_id)
+
+
+@receiver(post_save, sender=DestinationRate)
+def queue_repricing(sender, instance, **kwargs):
+    # Future tours were priced at the old rates; committed or rolled back with the change
+    RepriceJob.enqueue(instance.destination_id)
+
+
+@receiver(post_save, sender=Destination)
+def forget_new_destination(sender, instance, created, **kwargs):
+    # Never let a new destination inherit an entry cached under a reused id
+    if created:
+        forget_rates(instance.pk)
+
+
+@receiver(post_delete, sender=Destination)
+def forget_deleted_destination(sender, instance, **kwargs):
+    forget_rates(instance.pk)
+
+
+@receiver(pre_save, sender=Tour)
+def remember_previous_totals(sender, instance, **kwargs):
+    instance._previous_totals = None
+    if instance.pk:
+        instance._previous_totals = sender.objects.filter(pk=instance.pk).values(*stats.TOUR_FIELDS).first()
+
+
+@receiver(post_save, sender=Tour)
+def update_stats_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_totals', None)
+    stats.record(added=[stats.tour_values(instance)], removed=[previous] if previous else [])
+
+
+@receiver(post_delete, sender=Tour)
+def update_stats_on_delete(sender, instance, **kwargs):
+    stats.record(removed=[stats.tour_values(instance)])
@@ -0,0 +1,207 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from destination.models import Destination
+from .pricing import CENTS
+from .models import DestinationMonthStats, Tour, UserTourStats
+
+STATS_FIELDS = ('tours', 'revenue', 'adults', 'children', 'kids')
+# What a tour contributes to the totals, and which rows it counts towards
+TOUR_FIELDS = ('destination_id', 'user_id', 'start_date', 'price', 'adults', 'children', 'kids')
+# Keys per statement, keeping the CASE expressions well inside SQLite's variable limit
+BATCH_SIZE = 200
+TOTALS = {
+    'tours': Count('id'),
+    'revenue': Sum('price'),
+    'adults': Sum('adults'),
+    'children': Sum('children'),
+    'kids': Sum('kids'),
+}
+
+
+def month_of(moment):
+    """First day of ``moment``'s month in the current timezone, as TruncMonth buckets it"""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def tour_values(tour):
+    return {field: getattr(tour, field) for field in TOUR_FIELDS}
+
+
+def record(added=(), removed=()):
+    """
+    Fold tours into the summary tables. ``added`` and ``removed`` hold
+    TOUR_FIELDS dicts (see ``tour_values``); an edit removes the old values
+    and adds the new ones. Deltas are summed per row first and written with
+    a few set-based statements (``apply_deltas``), however many tours,
+    months and users are involved.
+    """
+    deltas = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0)))
+    counters = defaultdict(lambda: [0, 0])  # destination_id -> [tours, participants]
+    for values, sign in [(values, 1) for values in added] + [(values, -1) for values in removed]:
+        counter = counters[values['destination_id']]
+        counter[0] += sign
+        counter[1] += sign * (values['adults'] + values['children'] + values['kids'])
+        month = month_of(values['start_date'])
+        keys = [(DestinationMonthStats, (('destination_id', values['destination_id']), ('month', month)))]
+        if values['user_id'] is not None:
+            keys.append((UserTourStats, (('user_id', values['user_id']),)))
+        for model, lookup in keys:
+            delta = deltas[model][lookup]
+            delta['tours'] += sign
+            delta['revenue'] += sign * values['price']
+            for field in ('adults', 'children', 'kids'):
+                delta[field] += sign * values[field]
+
+    with transaction.atomic():
+        for model, model_deltas in deltas.items():
+            apply_deltas(model, model_deltas)
+        # Popularity inputs; not part of the destination payload, so no cache invalidation
+        counters = {pk: counter for pk, counter in counters.items() if any(counter)}
+        ids = list(counters)
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            Destination.objects.filter(pk__in=batch).update(
+                tour_count=F('tour_count') + _by_key([(Q(pk=pk), counters[pk][0]) for pk in batch]),
+                participant_count=F('participant_count') + _by_key([(Q(pk=pk), counters[pk][1]) for pk in batch]),
+            )
+
+
+def adjust_revenue(changes):
+    """
+    Move revenue without touching counts, for writes that bypass the Tour
+    signals. ``changes`` holds dicts with destination_id, month, user_id and
+    the revenue ``delta`` for that combination.
+    """
+    deltas = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0)))
+    for change in changes:
+        deltas[DestinationMonthStats][(('destination_id', change['destination_id']), ('month', change['month']))]['revenue'] += change['delta']
+        if change['user_id'] is not None:
+            deltas[UserTourStats][(('user_id', change['user_id']),)]['revenue'] += change['delta']
+    with transaction.atomic():
+        for model, model_deltas in deltas.items():
+            apply_deltas(model, model_deltas)
+
+
+def _by_key(cases, output_field=None):
+    """``CASE WHEN <condition> THEN <amount> ... ELSE 0`` from ``[(condition, amount)]``"""
+    return Case(*(When(condition, then=Value(amount)) for condition, amount in cases), default=Value(0), output_field=output_field)
+
+
+def apply_deltas(model, deltas):
+    """
+    Add ``{lookup: delta}`` to the summary rows of ``model``, where lookup is
+    a tuple of (field, value) pairs. Per BATCH_SIZE keys this is one INSERT
+    that skips existing rows, one UPDATE adding each row's delta through a
+    CASE, and a DELETE of rows whose tours dropped to zero.
+    """
+    keys = [lookup for lookup, delta in deltas.items() if any(delta.values())]
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        new = [model(**dict(lookup)) for lookup in batch if deltas[lookup]['tours'] > 0]
+        if new:
+            # Zeroed rows to add to; rows that already exist are left alone. Keys with
+            # nothing to add aren't created: their row went with a cascade-deleted
+            # destination or user
+            model.objects.bulk_create(new, ignore_conflicts=True)
+
+        changes = {}
+        for field in STATS_FIELDS:
+            cases = [(Q(**dict(lookup)), deltas[lookup][field]) for lookup in batch if deltas[lookup][field]]
+            if cases:
+                changes[field] = F(field) + _by_key(cases, model._meta.get_field(field))
+        rows = reduce(operator.or_, (Q(**dict(lookup)) for lookup in batch))
+        model.objects.filter(rows).update(**changes, updated_at=timezone.now())
+        if any(deltas[lookup]['tours'] < 0 for lookup in batch):
+            model.objects.filter(rows, tours=0).delete()
+
+
+def aggregate(queryset=None):
+    """
+    The totals straight from the Tour table, as ``({(destination_id, month):
+    totals}, {user_id: totals})``. This is the full scan the summary tables
+    exist to avoid; it backs ``rebuild`` and ``reconcile``.
+    """
+    queryset = Tour.objects.all() if queryset is None else queryset
+    months = queryset.annotate(month=TruncMonth('start_date', output_field=DateField())).order_by()
+    by_month = {
+        (row.pop('destination'), row.pop('month')): row
+        for row in months.values('destination', 'month').annotate(**TOTALS)
+    }
+    by_user = {
+        row.pop('user'): row
+        for row in queryset.filter(user__isnull=False).order_by().values('user').annotate(**TOTALS)
+    }
+    for row in [*by_month.values(), *by_user.values()]:
+        # SQLite sums decimals as floats, e.g. 16387.2500000001
+        row['revenue'] = row['revenue'].quantize(CENTS)
+    return by_month, by_user
+
+
+def recount_destinations():
+    """Reset every destination's tour_count and participant_count from the Tour table"""
+    tours = Tour.objects.filter(destination=OuterRef('pk')).order_by().values('destination')
+    return Destination.objects.update(
+        tour_count=Coalesce(Subquery(tours.annotate(total=Count('id')).values('total')), 0),
+        participant_count=Coalesce(
+            Subquery(tours.annotate(total=Sum(F('adults') + F('children') + F('kids'))).values('total')), 0
+        ),
+    )
+
+
+def rebuild():
+    """
+    Recompute both summary tables and the destination counters from scratch;
+    returns the number of summary rows written to each table
+    """
+    by_month, by_user = aggregate()
+    with transaction.atomic():
+        recount_destinations()
+        DestinationMonthStats.objects.all().delete()
+        UserTourStats.objects.all().delete()
+        DestinationMonthStats.objects.bulk_create(
+            DestinationMonthStats(destination_id=destination_id, month=month, **totals)
+            for (destination_id, month), totals in by_month.items()
+        )
+        UserTourStats.objects.bulk_create(
+            UserTourStats(user_id=user_id, **totals) for user_id, totals in by_user.items()
+        )
+    return len(by_month), len(by_user)
+
+
+def reconcile():
+    """
+    ``[(key, stored totals, actual totals)]`` for every summary row or
+    destination counter that disagrees with the Tour table
+    """
+    by_month, by_user = aggregate()
+    stored_months = {
+        (row.pop('destination_id'), row.pop('month')): row
+        for row in DestinationMonthStats.objects.values('destination_id', 'month', *STATS_FIELDS)
+    }
+    stored_users = {row.pop('user_id'): row for row in UserTourStats.objects.values('user_id', *STATS_FIELDS)}
+    counters = defaultdict(lambda: {'tour_count': 0, 'participant_count': 0})
+    for (destination_id, _), totals in by_month.items():
+        counters[destination_id]['tour_count'] += totals['tours']
+        counters[destination_id]['participant_count'] += totals['adults'] + totals['children'] + totals['kids']
+    stored_counters = {
+        row.pop('id'): row
+        for row in Destination.objects.exclude(tour_count=0, participant_count=0).values('id', 'tour_count', 'participant_count')
+    }
+
+    drift = []
+    for label, stored, actual in (
+        ('destination month', stored_months, by_month),
+        ('user', stored_users, by_user),
+        ('destination counters', stored_counters, dict(counters)),
+    ):
+        for key in stored.keys() | actual.keys():
+            if stored.get(key) != actual.get(key):
+                drift.append(((label, key), stored.get(key), actual.get(key)))
+    return drift
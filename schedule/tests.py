@@ -1,3 +1,586 @@
-from django.test import TestCase
+import csv
+import json
+import os
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from destination.models import Category, Destination
+from destination.tests import QueryBudgetMixin, compiled_calls, create_destinations
+from . import stats
+from .models import Booking, DestinationMonthStats, DestinationRate, RepriceJob, Tour
+from .rates import rate_cache
+from .repricing import reprice_tours
+from .serializers import TourSerializer
+from .views import TourViewSet
+
+User = get_user_model()
+
+
+class TourFixtureMixin:
+    def setUp(self):
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'pass', is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='camping')
+        self.destinations = create_destinations(category, 3)
+        for destination in self.destinations:
+            DestinationRate.objects.create(destination=destination, adult_rate=100, child_rate=50, kid_rate=0)
+
+    def create_rows(self, count):
+        start = timezone.now() + timedelta(days=7)
+        for i in range(Tour.objects.count(), count):
+            Tour.objects.create(
+                user=self.user,
+                title=f"Tour {i}",
+                description="Trip",
+                destination=self.destinations[i % len(self.destinations)],
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                adults=2,
+            )
+
+    def bulk_payload(self, count, spread_days=1):
+        start = timezone.now() + timedelta(days=7)
+        return [
+            {
+                'title': f'Group {i}', 'description': 'Trip',
+                'destination': self.destinations[i % 3].pk if i % 2 else self.destinations[i % 3].name.upper(),
+                'start_date': (start + timedelta(days=i * spread_days)).isoformat(),
+                'end_date': (start + timedelta(days=i * spread_days + 1)).isoformat(),
+                'adults': 2, 'children': i % 2,
+            }
+            for i in range(count)
+        ]
+
+
+class TourQueryBudgetTests(TourFixtureMixin, QueryBudgetMixin, TestCase):
+    def test_list_query_budget(self):
+        # COUNT(*), tours joined with destination and category, images
+        self.assertQueryBudget(3, '/api/schedule/', [1, 5, 10], self.create_rows)
+
+
+class TourSerializerParityTests(TourFixtureMixin, TestCase):
+    """Compiled and stock DRF serialization must produce identical tour payloads"""
+
+    def test_parity(self):
+        self.create_rows(4)
+        tour = Tour.objects.first()
+        for url, params in [
+            ('/api/schedule/', {}),
+            ('/api/schedule/', {'fields': 'id,price,destination_details.name'}),
+            ('/api/schedule/', {'expand': 'destination_details.images', 'pagination': 'cursor'}),
+            (f'/api/schedule/{tour.pk}/', {}),
+        ]:
+            with self.subTest(url=url, **params):
+                with override_settings(COMPILED_SERIALIZERS=False), compiled_calls() as stock:
+                    expected = self.client.get(url, params)
+                with override_settings(COMPILED_SERIALIZERS=True), compiled_calls() as compiled:
+                    actual = self.client.get(url, params)
+                self.assertEqual(expected.status_code, 200)
+                self.assertFalse(stock.called)
+                self.assertTrue(compiled.called)
+                self.assertEqual(actual.content, expected.content)
+
+
+class TourSparseFieldsTests(TourFixtureMixin, TestCase):
+    def test_expand_adds_to_fields(self):
+        self.create_rows(3)
+        # COUNT(*), tours, then destination joined with category, then its images
+        for params, keys, queries in [
+            ({'fields': 'id,title'}, {'id', 'title'}, 2),
+            ({'fields': 'id,title', 'expand': 'destination_details'}, {'id', 'title', 'destination_details'}, 2),
+            ({'fields': 'id', 'expand': 'destination_details.images'}, {'id', 'destination_details'}, 3),
+            ({'fields': 'id,destination_details.name'}, {'id', 'destination_details'}, 2),
+        ]:
+            with self.subTest(**params):
+                with self.assertNumQueries(queries):
+                    row = self.client.get('/api/schedule/', params).data['results'][0]
+                self.assertEqual(set(row), keys)
+                if 'destination_details' in keys:
+                    self.assertEqual('images' in row['destination_details'], 'images' in params.get('expand', ''))
+
+
+class RateCacheTests(TourFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        rate_cache.invalidate()
+        # The counters are process-wide; start this test's from zero
+        self.enterContext(mock.patch.object(rate_cache, 'stats', {'hits': 0, 'misses': 0, 'invalidations': 0}))
+        self.destination = self.destinations[0]
+
+    def test_hits_misses_and_missing_rates(self):
+        bare = Destination.objects.create(
+            name='No rates', description='Trip', category=self.destination.category, address='Nowhere',
+            latitude=31.5, longitude=74.3,
+        )
+        ids = [self.destination.pk, bare.pk, 0]
+        with self.assertNumQueries(1):
+            rates = rate_cache.get_many(ids)
+        # Unknown ids are left out; a destination without rates is cached as None
+        self.assertEqual(rates, {self.destination.pk: (Decimal('100.00'), Decimal('50.00'), Decimal('0.00')), bare.pk: None})
+        with self.assertNumQueries(0):
+            self.assertEqual(rate_cache.get_many(ids[:2]), rates)
+        snapshot = rate_cache.snapshot()
+        self.assertEqual((snapshot['hits'], snapshot['size']), (2, 2))
+
+    def test_entries_expire_after_ttl(self):
+        with mock.patch('schedule.rates.time.monotonic', return_value=1000.0):
+            rate_cache.get(self.destination.pk)
+        DestinationRate.objects.filter(destination=self.destination).update(adult_rate=120)
+        with mock.patch('schedule.rates.time.monotonic', return_value=1299.0), self.assertNumQueries(0):
+            self.assertEqual(rate_cache.get(self.destination.pk)[0], 100)
+        with mock.patch('schedule.rates.time.monotonic', return_value=1301.0), self.assertNumQueries(1):
+            self.assertEqual(rate_cache.get(self.destination.pk)[0], 120)
+
+    def test_saved_rates_are_dropped_again_on_commit(self):
+        rate = DestinationRate.objects.get(destination=self.destination)
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.adult_rate = 120
+            rate.save()
+            self.assertEqual(rate_cache.get(self.destination.pk)[0], 120)
+            # A concurrent request caching the committed, old row before this commit
+            rate_cache.update({self.destination.pk: (Decimal('100.00'), Decimal('50.00'), Decimal('0.00'))})
+        self.assertEqual(rate_cache.get(self.destination.pk)[0], 120)
+
+    def test_stats_endpoint(self):
+        url = '/api/schedule/rate-cache/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        rate_cache.get_many([self.destination.pk])
+        rate_cache.get_many([self.destination.pk])
+        data = self.client.get(url).data
+        self.assertEqual(
+            {key: data[key] for key in ('hits', 'misses', 'size', 'hit_rate')},
+            {'hits': 1, 'misses': 1, 'size': 1, 'hit_rate': 0.5},
+        )
+        self.assertEqual(data['pid'], os.getpid())
+
+
+class TourBookingTests(TourFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_rows(1)
+        self.tour = Tour.objects.get()
+        self.tour.capacity = 3
+        self.tour.bookable = True
+        self.tour.save()
+        self.url = f'/api/schedule/{self.tour.pk}/'
+
+    def join(self, user, seats=1):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'{self.url}join/', {'seats': seats}, format='json')
+
+    def test_join_until_full_then_leave(self):
+        guests = [User.objects.create_user(f'guest{i}', f'guest{i}@example.com', 'pass') for i in range(3)]
+        response = self.join(guests[0], seats=2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['current_participants'], 2)
+        self.assertEqual(self.join(guests[0]).status_code, 409)
+        self.assertEqual(self.join(guests[1], seats=2).status_code, 409)
+        self.assertEqual(self.join(guests[1]).status_code, 201)
+        self.assertEqual(self.join(guests[2]).status_code, 409)
+
+        client = APIClient()
+        client.force_authenticate(guests[0])
+        response = client.post(f'{self.url}leave/')
+        self.assertEqual((response.status_code, response.data['seats'], response.data['current_participants']), (200, 2, 1))
+        self.assertEqual(client.post(f'{self.url}leave/').status_code, 404)
+        self.assertEqual(self.join(guests[2]).status_code, 201)
+
+    def test_private_and_started_tours(self):
+        guest = User.objects.create_user('guest', 'guest@example.com', 'pass')
+        Tour.objects.filter(pk=self.tour.pk).update(bookable=False)
+        response = self.join(guest)
+        self.assertEqual((response.status_code, response.data), (404, {'error': 'Tour not found'}))
+        client = APIClient()
+        client.force_authenticate(guest)
+        self.assertEqual(client.post(f'{self.url}leave/').data, {'error': 'Tour not found'})
+        # The owner can still book their own tour
+        self.assertEqual(self.join(self.user).status_code, 201)
+
+        Tour.objects.filter(pk=self.tour.pk).update(bookable=True, start_date=timezone.now() - timedelta(hours=1))
+        response = self.join(guest)
+        self.assertEqual((response.status_code, response.data), (409, {'error': 'This tour has already started'}))
+        self.assertEqual(Tour.objects.get(pk=self.tour.pk).current_participants, 1)
+
+    def test_full_save_keeps_concurrent_bookings(self):
+        stale = Tour.objects.get(pk=self.tour.pk)
+        self.join(User.objects.create_user('guest', 'guest@example.com', 'pass'))
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(Tour.objects.get(pk=self.tour.pk).current_participants, 1)
+
+
+class TourCalendarTests(TourFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_rows(3)
+        self.day = timezone.now().replace(microsecond=0) + timedelta(days=30)
+        spans = [(0, 2), (4, 5), (1, 6)]
+        owners = [self.user, self.user, User.objects.create_user('other', 'other@example.com', 'pass')]
+        self.tours = list(Tour.objects.order_by('id'))
+        for tour, (start, end), owner in zip(self.tours, spans, owners):
+            Tour.objects.filter(pk=tour.pk).update(
+                start_date=self.day + timedelta(days=start), end_date=self.day + timedelta(days=end), user=owner
+            )
+
+    def window(self, start, end):
+        return {
+            'overlaps_from': (self.day + timedelta(days=start)).isoformat(),
+            'overlaps_to': (self.day + timedelta(days=end)).isoformat(),
+        }
+
+    def test_calendar_is_half_open_and_compact(self):
+        response = self.client.get('/api/schedule/calendar/', self.window(2, 4))
+        self.assertEqual(response.data['tours'], [])
+        response = self.client.get('/api/schedule/calendar/', self.window(1, 4.5))
+        self.assertEqual([tour['id'] for tour in response.data['tours']], [self.tours[0].pk, self.tours[1].pk])
+        self.assertEqual(set(response.data['tours'][0]), {'id', 'title', 'start_date', 'end_date'})
+
+    def test_list_filter_and_admin_scope(self):
+        response = self.client.get('/api/schedule/', {'overlaps_from': self.window(3, 4)['overlaps_from']})
+        self.assertEqual([tour['id'] for tour in response.data['results']], [self.tours[1].pk])
+        self.assertEqual(self.client.get('/api/schedule/calendar/', {'scope': 'all', **self.window(0, 7)}).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/schedule/calendar/', {'scope': 'all', **self.window(0, 7)})
+        self.assertEqual([tour['id'] for tour in response.data['tours']], [t.pk for t in self.tours[::2] + self.tours[1:2]])
+
+    def test_invalid_windows(self):
+        self.assertEqual(self.client.get('/api/schedule/calendar/', {'overlaps_from': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule/calendar/', self.window(3, 1)).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule/calendar/', self.window(0, 400)).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule/calendar/', {'overlaps_to': self.window(0, 1)['overlaps_to']}).status_code, 400)
+
+
+class TourBulkCreateTests(TourFixtureMixin, TestCase):
+
+    def test_bulk_create_prices_like_single_create(self):
+        tours = self.bulk_payload(4)
+        single = self.client.post('/api/schedule/', dict(tours[1]), format='json')
+        response = self.client.post('/api/schedule/bulk/', {'tours': tours}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([tour['price'] for tour in response.data['tours']], ['200.00', '250.00', '200.00', '250.00'])
+        self.assertEqual(response.data['tours'][1]['price'], single.data['price'])
+        self.assertEqual(Tour.objects.filter(user=self.user, title__startswith='Group').count(), 5)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        counts = []
+        # 20 tours five days apart fall into several months, each a new stats row
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/schedule/bulk/?fields=id,price', self.bulk_payload(size, 5), format='json')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(stats.reconcile(), [])
+
+    def test_errors_are_reported_per_item_and_nothing_is_created(self):
+        tours = self.bulk_payload(3)
+        tours[1]['destination'] = 'Nowhere'
+        del tours[2]['title']
+        response = self.client.post('/api/schedule/bulk/', tours, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('destination', response.data['errors'][0]['errors'])
+        self.assertFalse(Tour.objects.exists())
+
+
+class DestinationReferenceTests(TourFixtureMixin, TestCase):
+    def tour(self, destination):
+        start = timezone.now() + timedelta(days=7)
+        return {
+            'title': 'Trip', 'description': 'Trip', 'destination': destination, 'adults': 1,
+            'start_date': start.isoformat(), 'end_date': (start + timedelta(days=1)).isoformat(),
+        }
+
+    def test_names_resolve_on_normalized_key(self):
+        self.destinations[0].name = 'Café Straße'
+        self.destinations[0].save()
+        response = self.client.post('/api/schedule/', self.tour('  CAFÉ   strasse '), format='json')
+        self.assertEqual((response.status_code, response.data['destination']), (201, self.destinations[0].pk))
+
+    def test_ambiguous_name_is_a_validation_error(self):
+        Destination.objects.filter(pk=self.destinations[1].pk).update(name='Destination 0', name_key='destination 0')
+        with self.assertLogs('schedule.views', 'ERROR'):
+            response = self.client.post('/api/schedule/', self.tour('destination 0'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('use the destination ID', str(response.data['destination']))
+        response = self.client.post('/api/schedule/quote/', [{'destination': 'Destination 0', 'adults': 1}], format='json')
+        self.assertIn('use the destination ID', response.data['quotes'][0]['error'])
+
+    def test_list_validation_looks_destinations_up_once(self):
+        references = [self.destinations[0].pk, 'destination 1', 'DESTINATION 2', 'Nowhere', self.destinations[0].pk]
+        with CaptureQueriesContext(connection) as queries:
+            serializer = TourSerializer(data=[self.tour(ref) for ref in references], many=True)
+            serializer.is_valid()
+        lookups = [q['sql'] for q in queries if 'FROM "destination_destination"' in q['sql'] and 'schedule_destinationrate' not in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual([bool(errors) for errors in serializer.errors], [False, False, False, True, False])
+
+
+class TourStatsTests(TourFixtureMixin, TestCase):
+    def test_incremental_totals_reconcile_with_tour_table(self):
+        self.create_rows(6)
+        tours = list(Tour.objects.order_by('id'))
+        # Edits that move a tour between destination, month and user rows
+        tours[0].adults = 5
+        tours[0].save()
+        tours[1].destination = self.destinations[2]
+        tours[1].start_date += timedelta(days=40)
+        tours[1].end_date += timedelta(days=40)
+        tours[1].save()
+        tours[2].user = User.objects.create_user('agent', 'agent@example.com', 'pass')
+        tours[2].save()
+        tours[3].delete()
+        self.client.post('/api/schedule/bulk/', self.bulk_payload(3), format='json')
+        self.assertEqual(stats.reconcile(), [])
+
+        # Cascades delete tours one by one, after their stats rows are gone
+        self.destinations[0].delete()
+        tours[2].user.delete()
+        self.assertEqual(stats.reconcile(), [])
+
+        DestinationMonthStats.objects.update(tours=99)
+        self.assertTrue(stats.reconcile())
+        call_command('rebuild_tour_stats', stdout=StringIO())
+        self.assertEqual(stats.reconcile(), [])
+
+    def test_stats_endpoint_reads_summary_rows(self):
+        self.create_rows(3)
+        tour = Tour.objects.filter(destination=self.destinations[1]).get()
+        month = timezone.localtime(tour.start_date).strftime('%Y-%m')
+        self.assertEqual(self.client.get('/api/schedule/stats/', {'month': month}).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/schedule/stats/', {'destination': self.destinations[1].pk, 'month': month})
+        self.assertEqual(response.data['results'], [{
+            'destination': self.destinations[1].pk, 'month': month, 'tours': 1, 'revenue': '200.00',
+            'adults': 2, 'children': 0, 'kids': 0, 'participants': 2, 'updated_at': response.data['results'][0]['updated_at'],
+        }])
+        response = self.client.get('/api/schedule/stats/', {'user': self.user.pk})
+        self.assertEqual((response.data['tours'], response.data['revenue']), (3, '600.00'))
+        self.assertEqual(self.client.get('/api/schedule/stats/', {'month': 'June'}).status_code, 400)
+
+
+class TourRepricingTests(TourFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_rows(6)
+        self.past = Tour.objects.filter(destination=self.destinations[0]).first()
+        self.past.start_date -= timedelta(days=30)
+        self.past.end_date -= timedelta(days=30)
+        self.past.save()
+        rate = DestinationRate.objects.get(destination=self.destinations[0])
+        rate.adult_rate, rate.child_rate = Decimal('33.34'), Decimal('12.10')
+        rate.save()
+
+    def test_dry_run_lists_changes_without_writing(self):
+        out = StringIO()
+        call_command('reprice_tours', dry_run=True, stdout=out)
+        self.assertIn('200.00 ->      66.68', out.getvalue())
+        self.assertIn('Would reprice 1 future tours', out.getvalue())
+        self.assertFalse(Tour.objects.filter(price='66.68').exists())
+
+    def test_future_tours_are_repriced_and_totals_follow(self):
+        repriced, _, _ = reprice_tours([self.destinations[0].pk])
+        self.assertEqual(repriced, 1)
+        for tour in Tour.objects.exclude(pk=self.past.pk):
+            with self.subTest(tour=tour.title):
+                self.assertEqual(tour.price, tour.calculate_price())
+        self.assertEqual(Tour.objects.get(pk=self.past.pk).price, 200)
+        self.assertEqual(stats.reconcile(), [])
+        self.assertEqual(reprice_tours()[0], 0)
+
+    def test_rate_changes_are_queued_with_a_follow_up_pass(self):
+        job = RepriceJob.objects.get(destination=self.destinations[0])
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.follow_up_at - job.run_after, timedelta(seconds=300 + RepriceJob.FOLLOW_UP_MARGIN))
+
+        out = StringIO()
+        call_command('reprice_worker', once=True, stdout=out)
+        self.assertIn('Destination %d: follow-up, 1 tours repriced' % self.destinations[0].pk, out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.run_after), ('pending', job.follow_up_at))
+
+        # Another process still pricing from its cached, old rates
+        rate_cache.update({self.destinations[0].pk: (Decimal('100.00'), Decimal('50.00'), Decimal('0.00'))})
+        self.create_rows(7)
+        rate_cache.invalidate()
+        self.assertEqual(Tour.objects.get(title='Tour 6').price, 200)
+
+        RepriceJob.objects.filter(pk=job.pk).update(run_after=timezone.now(), follow_up_at=timezone.now())
+        call_command('reprice_worker', once=True, stdout=out)
+        self.assertEqual(RepriceJob.objects.get(pk=job.pk).status, 'done')
+        self.assertEqual(Tour.objects.get(title='Tour 6').price, Decimal('66.68'))
+        self.assertEqual(stats.reconcile(), [])
+
+    def test_busy_database_is_retried(self):
+        RepriceJob.objects.exclude(destination=self.destinations[0]).delete()
+        with mock.patch('schedule.repricing.reprice_tours', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('schedule.repricing', 'WARNING'):
+            call_command('reprice_worker', once=True, stdout=StringIO())
+        job = RepriceJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'database is locked'))
+        self.assertGreater(job.run_after, timezone.now())
+
+
+class ExportTests(TourFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_rows(4)
+        self.admin = User.objects.create_user('exporter', 'exporter@example.com', 'pass', is_staff=True)
+
+    def export(self, table, **params):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(f'/api/exports/{table}/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/exports/tours/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/exports/tours/').status_code, 401)
+
+    def test_ndjson_and_csv_rows(self):
+        rows = [json.loads(line) for line in self.export('tours').splitlines()]
+        tour = Tour.objects.order_by('pk').first()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['id'], tour.pk)
+        self.assertEqual(rows[0]['destination'], tour.destination.slug)
+        self.assertEqual(rows[0]['price'], '200.00')
+        self.assertEqual(rows[0]['start_date'], timezone.localtime(tour.start_date).isoformat())
+
+        lines = list(csv.reader(StringIO(self.export('tours', format='csv'))))
+        self.assertEqual(lines[0], list(rows[0]))
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[1][lines[0].index('price')], '200.00')
+
+        images = [json.loads(line) for line in self.export('images').splitlines()]
+        self.assertEqual(len(images), 6)
+        self.assertTrue(images[0]['image'].startswith('http://testserver/media/destinations/'))
+
+    def test_filters_and_updated_since(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        Tour.objects.filter(pk=Tour.objects.order_by('pk').first().pk).update(user=other)
+        self.assertEqual(len(self.export('tours', user=self.user.pk).splitlines()), 3)
+        self.assertEqual(len(self.export('tours', destination=self.destinations[1].slug).splitlines()), 1)
+        self.assertEqual(len(self.export('rates', destination=self.destinations[1].slug).splitlines()), 1)
+        self.assertEqual(len(self.export('destinations', city='LAHORE').splitlines()), 3)
+
+        Tour.objects.filter(destination=self.destinations[0]).update(updated_at=timezone.now() - timedelta(days=10))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(len(self.export('tours', updated_since=since).splitlines()), 2)
+
+        for params in [{'user': 'abc'}, {'updated_since': 'yesterday'}]:
+            with self.subTest(**params):
+                response = self.client.get('/api/exports/tours/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(b'error', response.content)
+
+
+class TourBookingLoadTests(TransactionTestCase):
+    def test_concurrent_bookings_never_oversell(self):
+        # The command raises CommandError if the counter and the bookings disagree
+        call_command('load_test_bookings', writers=4, users=40, capacity=25, stdout=StringIO())
+        self.assertFalse(Booking.objects.exists())
+
+
+class TourQuoteTests(TourFixtureMixin, TestCase):
+    url = '/api/schedule/quote/'
+
+    def setUp(self):
+        super().setUp()
+        rate_cache.invalidate()
+
+    def quote(self, payload):
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['quotes']
+
+    def test_prices_by_id_and_name(self):
+        rate = DestinationRate.objects.get(destination=self.destinations[1])
+        rate.adult_rate = Decimal('33.33')
+        rate.save()
+        quotes = self.quote({'quotes': [
+            {'destination': self.destinations[0].pk, 'adults': 2, 'children': 1, 'kids': 3},
+            {'destination': ' DESTINATION 1 ', 'adults': 3},
+            {'destination': self.destinations[0].pk, 'children': 4},
+        ]})
+        self.assertEqual(
+            [(quote['destination_id'], quote['price']) for quote in quotes],
+            [(self.destinations[0].pk, '250.00'), (self.destinations[1].pk, '99.99'), (self.destinations[0].pk, '200.00')],
+        )
+        self.assertEqual(quotes[1], {
+            'destination': ' DESTINATION 1 ', 'destination_id': self.destinations[1].pk,
+            'adults': 3, 'children': 0, 'kids': 0, 'price': '99.99',
+        })
+
+    def test_errors_are_reported_per_item(self):
+        bare = Destination.objects.create(
+            name='No rates', description='Trip', category=self.destinations[0].category, address='Nowhere',
+            latitude=31.5, longitude=74.3,
+        )
+        quotes = self.quote([
+            {'destination': 0, 'adults': 1},
+            {'destination': 'Atlantis', 'adults': 1},
+            {'destination': bare.pk, 'adults': 1},
+            {'destination': 'no rates', 'adults': 1},
+            {'destination': self.destinations[2].pk, 'adults': 1},
+        ])
+        self.assertEqual([(quote['price'], quote.get('error')) for quote in quotes], [
+            (None, 'Destination not found'),
+            (None, 'Destination not found'),
+            (None, 'Rates not set for this destination'),
+            (None, 'Rates not set for this destination'),
+            ('100.00', None),
+        ])
+        self.assertEqual((quotes[1]['destination_id'], quotes[3]['destination_id']), (None, bare.pk))
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def batch(count):
+            return [
+                {'destination': self.destinations[i % 3].pk if i % 2 else f'destination {i % 3}', 'adults': 1}
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.quote(batch(3))
+        rate_cache.invalidate()
+        with CaptureQueriesContext(connection) as large:
+            quotes = self.quote(batch(300))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual({quote['price'] for quote in quotes}, {'100.00'})
+
+    def test_invalid_requests(self):
+        for payload, error in [
+            ([], 'Send a non-empty list of quotes'),
+            ({'quotes': {'destination': 1}}, 'Send a non-empty list of quotes'),
+            ([{'destination': 1}, 'Destination 0'], 'quotes[1] must be an object'),
+            ([{'adults': 1}], 'quotes[0].destination must be a destination ID or name'),
+            ([{'destination': True}], 'quotes[0].destination must be a destination ID or name'),
+            ([{'destination': ''}], 'quotes[0].destination must be a destination ID or name'),
+            ([{'destination': 1, 'adults': -1}], 'quotes[0].adults must be a non-negative integer'),
+            ([{'destination': 1, 'children': 1.5}], 'quotes[0].children must be a non-negative integer'),
+            ([{'destination': 1, 'kids': '2'}], 'quotes[0].kids must be a non-negative integer'),
+            ([{'destination': 1}] * 3, 'At most 2 quotes per request'),
+        ]:
+            with self.subTest(payload=payload), mock.patch.object(TourViewSet, 'max_quotes', 2):
+                response = self.client.post(self.url, payload, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {'error': error})
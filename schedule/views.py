@@ -1,50 +1,281 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, PermissionDenied
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
+from datetime import timedelta
 import logging
+import os
+from nomadic_travel.exports import parse_since
+from nomadic_travel.renderers import StreamingListMixin
+from nomadic_travel.serializers import is_expanded
 from .models import Tour
-from .serializers import TourSerializer
+from destination.models import Destination
+from destination.resolver import resolver_for
+from .models import DestinationMonthStats, UserTourStats
+from .serializers import (
+    DestinationMonthStatsSerializer, TourCalendarSerializer, TourSerializer, UserTourStatsSerializer,
+)
+from . import bookings, pricing, stats
+from .rates import rate_cache
 
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-class TourViewSet(viewsets.ModelViewSet):
+class TourViewSet(StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = TourSerializer
     permission_classes = [IsAuthenticated]
     ordering = ['-start_date']  # Ensure latest tours appear first
+    keyset_field = 'start_date'
+    max_quotes = 5000
+    max_bulk_tours = 500
+    max_calendar_days = 366
+    window_actions = ('list', 'calendar')
 
     def get_queryset(self):
-        return Tour.objects.filter(user=self.request.user)
+        if self.action in self.window_actions and self.request.query_params.get('scope') == 'all':
+            if not self.request.user.is_staff:
+                raise PermissionDenied("Only admins can list every user's tours")
+            queryset = Tour.objects.all()
+        else:
+            queryset = Tour.objects.filter(user=self.request.user)
+
+        if self.action in self.window_actions:
+            start, end = self.overlap_window()
+            # Half-open intervals: a tour ending exactly at overlaps_from doesn't overlap
+            if start is not None:
+                queryset = queryset.filter(end_date__gt=start)
+            if end is not None:
+                queryset = queryset.filter(start_date__lt=end)
+        if self.action == 'calendar':
+            return queryset
+
+        # Only load what the response embeds
+        if is_expanded(self.request, 'destination_details'):
+            queryset = queryset.select_related('destination__category')
+            if is_expanded(self.request, 'destination_details.images'):
+                queryset = queryset.prefetch_related('destination__images')
+        return queryset
+
+    def overlap_window(self):
+        """``(overlaps_from, overlaps_to)`` from the query string; either may be None"""
+        bounds = []
+        for param in ('overlaps_from', 'overlaps_to'):
+            value = self.request.query_params.get(param)
+            parsed = parse_since(value) if value else None
+            if value and parsed is None:
+                raise ParseError(f'{param} must be an ISO 8601 date or datetime')
+            bounds.append(parsed)
+        start, end = bounds
+        if start is not None and end is not None and end <= start:
+            raise ParseError('overlaps_to must be after overlaps_from')
+        return start, end
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Id, title and dates of the tours overlapping ``[overlaps_from, overlaps_to)``,
+        earliest first and unpaginated. Admins can add ``?scope=all`` for every user's tours.
+        """
+        start, end = self.overlap_window()
+        if start is None or end is None:
+            return Response({'error': 'overlaps_from and overlaps_to are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start > timedelta(days=self.max_calendar_days):
+            return Response(
+                {'error': f'The window can span at most {self.max_calendar_days} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Sorted here rather than in SQL: ORDER BY start_date steers SQLite onto the
+        # (user, start_date) index, which walks the user's whole history before
+        # overlaps_to, instead of seeking on end_date with tour_user_end_start_idx
+        tours = self.get_queryset().only('id', 'title', 'start_date', 'end_date').order_by()
+        tours = sorted(tours, key=lambda tour: (tour.start_date, tour.pk))
+        return Response({
+            'overlaps_from': start,
+            'overlaps_to': end,
+            'tours': TourCalendarSerializer(tours, many=True).data,
+        })
+
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """Price many (destination, adults, children, kids) parties without creating tours"""
+        items = request.data.get('quotes') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Send a non-empty list of quotes'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_quotes:
+            return Response({'error': f'At most {self.max_quotes} quotes per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        parties = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return Response({'error': f'quotes[{index}] must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+            destination = item.get('destination')
+            if isinstance(destination, bool) or not isinstance(destination, (int, str)) or destination == '':
+                return Response(
+                    {'error': f'quotes[{index}].destination must be a destination ID or name'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            party = {'destination': destination}
+            for field in pricing.PARTY_FIELDS:
+                count = item.get(field, 0)
+                if isinstance(count, bool) or not isinstance(count, int) or count < 0:
+                    return Response(
+                        {'error': f'quotes[{index}].{field} must be a non-negative integer'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                party[field] = count
+            parties.append(party)
+
+        return Response({'quotes': pricing.quote(parties, resolver_for(request))})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many tours in one transaction. Destinations and rates are loaded
+        once for the whole batch and the tours inserted with ``bulk_create``.
+        If any tour is invalid nothing is created, and the errors are reported
+        per item.
+        """
+        items = request.data.get('tours') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Send a non-empty list of tours'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_bulk_tours:
+            return Response({'error': f'At most {self.max_bulk_tours} tours per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        destinations = Destination.objects.select_related('category')
+        if is_expanded(request, 'destination_details.images'):
+            destinations = destinations.prefetch_related('images')
+        # DestinationField resolves through the same per-request resolver
+        resolver = resolver_for(request, destinations)
+        resolver.prime(item.get('destination') for item in items if isinstance(item, dict))
+        rates = rate_cache.get_many(destination.id for destination in resolver.loaded())
+        context = self.get_serializer_context()
+
+        tours, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'detail': 'Each tour must be an object'}})
+                continue
+            data = dict(item)
+            error = self.prepare_tour_data(data)
+            if error:
+                errors.append({'index': index, 'errors': {'detail': error}})
+                continue
+            # Rates come from the warmed cache, so validation makes no queries
+            serializer = TourSerializer(data=data, context=context)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            tours.append(Tour(user=request.user, **serializer.validated_data))
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_create skips Tour.save(), so price the tours here
+        for tour in tours:
+            tour.price = pricing.tour_price(rates[tour.destination_id], tour.adults, tour.children, tour.kids)
+        with transaction.atomic():
+            Tour.objects.bulk_create(tours)
+            # No post_save signals for bulk_create either
+            stats.record(added=[stats.tour_values(tour) for tour in tours])
+        return Response({'tours': self.get_serializer(tours, many=True).data}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='stats', permission_classes=[IsAdminUser])
+    def tour_stats(self, request):
+        """
+        Tour count, revenue and headcount read from the summary tables kept by
+        schedule.stats: per destination and month (``?destination=``,
+        ``?month=YYYY-MM`` or both), or for one user (``?user=``).
+        """
+        params = request.query_params
+        try:
+            destination = int(params['destination']) if params.get('destination') else None
+            user = int(params['user']) if params.get('user') else None
+            month = timezone.datetime.strptime(params['month'], '%Y-%m').date() if params.get('month') else None
+        except ValueError:
+            return Response(
+                {'error': 'destination and user must be IDs and month must look like 2024-06'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if user is not None:
+            row = UserTourStats.objects.filter(user_id=user).first() or UserTourStats(user_id=user)
+            return Response(UserTourStatsSerializer(row).data)
+        if destination is None and month is None:
+            return Response({'error': 'Pass destination, month or user'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = DestinationMonthStats.objects.all()
+        if destination is not None:
+            rows = rows.filter(destination_id=destination)
+        if month is not None:
+            rows = rows.filter(month=month)
+        return Response({'results': DestinationMonthStatsSerializer(rows, many=True).data})
+
+    @action(detail=False, methods=['get'], url_path='rate-cache', permission_classes=[IsAdminUser])
+    def rate_cache_stats(self, request):
+        """Hit/miss counters of the rate cache in the process serving this request"""
+        return Response({'pid': os.getpid(), **rate_cache.snapshot()})
+
+    def booking_response(self, pk, status_code, **data):
+        tour = Tour.objects.filter(pk=pk).values('current_participants', 'capacity').first()
+        return Response({**data, **tour}, status=status_code)
+
+    @action(detail=True, methods=['post'])
+    def join(self, request, pk=None):
+        """
+        Book seats on one of your tours or another user's ``bookable`` one.
+        Fails with 409 rather than overselling or booking a started tour.
+        """
+        seats = request.data.get('seats', 1)
+        if isinstance(seats, bool) or not isinstance(seats, int) or seats < 1:
+            return Response({'error': 'seats must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            booking = bookings.join_tour(int(pk), request.user, seats)
+        except (ValueError, Tour.DoesNotExist):
+            return Response({'error': 'Tour not found'}, status=status.HTTP_404_NOT_FOUND)
+        except bookings.BookingError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return self.booking_response(pk, status.HTTP_201_CREATED, status='joined', seats=booking.seats)
+
+    @action(detail=True, methods=['post'])
+    def leave(self, request, pk=None):
+        """Cancel the current user's booking and free its seats"""
+        try:
+            seats = bookings.leave_tour(int(pk), request.user)
+        except (ValueError, Tour.DoesNotExist):
+            return Response({'error': 'Tour not found'}, status=status.HTTP_404_NOT_FOUND)
+        except bookings.BookingError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return self.booking_response(pk, status.HTTP_200_OK, status='left', seats=seats)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    def create(self, request, *args, **kwargs):
-        # Log the request data
-        logger.info(f"Tour creation request data: {request.data}")
-        
+    def prepare_tour_data(self, data):
+        """
+        Defaults and the required-field, date and participant checks that run
+        before the serializer. Updates ``data`` in place; returns an error
+        message, or None.
+        """
         # Set default values for children and kids if not provided
-        if 'children' not in request.data:
-            request.data['children'] = 0
-        if 'kids' not in request.data:
-            request.data['kids'] = 0
+        if 'children' not in data:
+            data['children'] = 0
+        if 'kids' not in data:
+            data['kids'] = 0
         
         # Validate required fields
         required_fields = ['title', 'description', 'destination', 'start_date', 'end_date', 'adults']
-        missing_fields = [field for field in required_fields if field not in request.data]
+        missing_fields = [field for field in required_fields if field not in data]
         
         if missing_fields:
-            return Response(
-                {"detail": f"Missing required fields: {', '.join(missing_fields)}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return f"Missing required fields: {', '.join(missing_fields)}"
 
         # Validate dates
-        start_date = request.data.get('start_date')
-        end_date = request.data.get('end_date')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
         
         if start_date and end_date:
             try:
@@ -70,53 +301,42 @@ class TourViewSet(viewsets.ModelViewSet):
                     )
                 
                 if start < timezone.now():
-                    return Response(
-                        {"detail": "Start date cannot be in the past"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+                    return "Start date cannot be in the past"
                 
                 if end <= start:
-                    return Response(
-                        {"detail": "End date must be after start date"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+                    return "End date must be after start date"
                 
                 # Update the request data with timezone-aware dates
-                request.data['start_date'] = start.isoformat()
-                request.data['end_date'] = end.isoformat()
+                data['start_date'] = start.isoformat()
+                data['end_date'] = end.isoformat()
                 
-            except ValueError:
-                return Response(
-                    {"detail": "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            except (ValueError, AttributeError):
+                return "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"
 
         # Validate participant numbers
         try:
-            request.data['adults'] = int(request.data['adults'])
-            request.data['children'] = int(request.data['children'])
-            request.data['kids'] = int(request.data['kids'])
+            data['adults'] = int(data['adults'])
+            data['children'] = int(data['children'])
+            data['kids'] = int(data['kids'])
             
-            if request.data['adults'] < 0:
-                return Response(
-                    {"detail": "Adults count cannot be negative"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            if request.data['children'] < 0:
-                return Response(
-                    {"detail": "Children count cannot be negative"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            if request.data['kids'] < 0:
-                return Response(
-                    {"detail": "Kids count cannot be negative"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            if data['adults'] < 0:
+                return "Adults count cannot be negative"
+            if data['children'] < 0:
+                return "Children count cannot be negative"
+            if data['kids'] < 0:
+                return "Kids count cannot be negative"
         except (ValueError, TypeError):
-            return Response(
-                {"detail": "Invalid participant count format. All counts must be numbers."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return "Invalid participant count format. All counts must be numbers."
+
+        return None
+
+    def create(self, request, *args, **kwargs):
+        # Log the request data
+        logger.info(f"Tour creation request data: {request.data}")
+
+        error = self.prepare_tour_data(request.data)
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():